@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import numpy as np
+
+
+class Aggregates:
+    """
+    Running Vitamin D totals per day, ISO week and month.
+
+    Totals are adjusted by the reading delta whenever an entry is added or
+    replaced, so reads are a single dict lookup.
+    """
+
+    def __init__(self):
+        self.daily = {}
+        self.weekly = {}
+        self.monthly = {}
+
+    def rebuild(self, readings):
+        """
+        Recompute every total from (day, reading) pairs in one pass.
+        """
+        readings = list(readings)
+        self.daily, self.weekly, self.monthly = {}, {}, {}
+        if not readings:
+            return
+
+        days = np.array([day for day, _ in readings])
+        values = np.array([reading for _, reading in readings], dtype=np.int64)
+
+        unique_days, inverse = np.unique(days, return_inverse=True)
+        day_totals = np.bincount(inverse, weights=values).astype(np.int64)
+        self.daily = dict(zip(unique_days.tolist(), day_totals.tolist()))
+
+        dates = [datetime.strptime(day, "%d-%m-%Y") for day in unique_days.tolist()]
+        for totals, keys in (
+            (self.weekly, [week_key(date) for date in dates]),
+            (self.monthly, [month_key(date) for date in dates]),
+        ):
+            unique_keys, inverse = np.unique(np.array(keys), axis=0, return_inverse=True)
+            sums = np.bincount(inverse.ravel(), weights=day_totals).astype(np.int64)
+            totals.update(zip(map(tuple, unique_keys.tolist()), sums.tolist()))
+
+    def add(self, day, reading, previous_reading=0):
+        delta = reading - previous_reading
+        if not delta and day in self.daily:
+            return
+
+        date = datetime.strptime(day, "%d-%m-%Y")
+        self.daily[day] = self.daily.get(day, 0) + delta
+        self.weekly[week_key(date)] = self.weekly.get(week_key(date), 0) + delta
+        self.monthly[month_key(date)] = self.monthly.get(month_key(date), 0) + delta
+
+    def daily_total(self, day):
+        return self.daily.get(day, 0)
+
+    def weekly_total(self, day):
+        return self.weekly.get(week_key(datetime.strptime(day, "%d-%m-%Y")), 0)
+
+    def monthly_total(self, day):
+        return self.monthly.get(month_key(datetime.strptime(day, "%d-%m-%Y")), 0)
+
+
+def week_key(date):
+    iso_year, iso_week, _ = date.isocalendar()
+    return iso_year, iso_week
+
+
+def month_key(date):
+    return date.year, date.month
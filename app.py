@@ -1,44 +1,98 @@
+import time
+
+START = time.perf_counter()
+
 import sys
+import constants
+import sensor
+from archive import SensorArchive
 import ui
+from PyQt6.QtCore import QEvent, QObject, QTimer
 from PyQt6.QtWidgets import QApplication
 from data import VitaminDTracker, UserData
-from time import sleep
 
 
-class Controller:
+class StartupReport(QObject):
+    """
+    Milestones from the start of app.py to a drawn main view, printed as
+    "startup <milestone> <ms>" lines (see benchmarks/startup_report.py).
+    """
+
     def __init__(self):
+        super().__init__()
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter()))
+
+    def watch(self, window):
+        window.installEventFilter(self)
+        main_view = window.views.get("main")
+        if main_view:
+            main_view.ready.connect(self.finish)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            obj.removeEventFilter(self)
+            self.mark("first_paint")
+            if "main" not in obj.views:
+                QTimer.singleShot(0, self.finish)
+        return False
+
+    def finish(self):
+        self.mark("main_view_ready")
+        for name, mark in self.marks:
+            print(f"startup {name} {(mark - START) * 1000:.1f}")
+        QApplication.instance().quit()
+
+
+class Controller:
+    def __init__(self, startup_report=False):
+        self.report = StartupReport() if startup_report else None
+        self.mark("imports")
+
         self.tracker = VitaminDTracker()
+        self.mark("tracker_loaded")
         self.app = QApplication([])
-        self.sensor_data = []
-        self.items = []
-        self.curr = 0
         self.user_data = UserData()
+        self.sensor = sensor.SensorReader(
+            sensor.make_source(constants.sensor_source, **constants.sensor_options)
+        )
+        self.archive = SensorArchive(constants.sensor_archive_path)
+        self.sensor.add_consumer(self.archive.add)
 
         self.button_callbacks = {
             "settings": self.on_click_settings,
             "log": self.on_click_log,
             "back": self.on_click_back,
-            # "sensor": self.onClickSensor,
+            "sensor": self.on_click_sensor,
         }
 
-        self.window = ui.MainWindow(self.user_data, self.tracker, self.button_callbacks)
-        self.window.sensor_data = self.sensor_data
-
-    def task(self):
-        self.items.extend(list(range(0, 20)))
-        self.curr = 19
-
-        while True:
-            print(self.items)
-            self.items.append(self.curr)
-            self.curr += 1
+        self.window = ui.MainWindow(
+            self.user_data,
+            self.tracker,
+            self.button_callbacks,
+            self.sensor,
+            self.archive,
+        )
+        self.mark("window_built")
 
-            sleep(2)
+    def mark(self, name):
+        if self.report:
+            self.report.mark(name)
 
     def start(self):
+        if self.report:
+            self.report.watch(self.window)
         self.window.show()
+        self.sensor.start()
 
         exit_code = self.app.exec()
+        if self.window.sync:
+            self.window.sync.stop()
+        self.window.sessions.stop()
+        self.sensor.stop()
+        self.archive.close()
         self.tracker.backup()
 
         sys.exit(exit_code)
@@ -61,4 +115,4 @@ class Controller:
 
 
 if __name__ == "__main__":
-    Controller().start()
+    Controller(startup_report="--startup-report" in sys.argv).start()
@@ -0,0 +1,267 @@
+"""
+On-disk archive of raw lux samples with downsampled tiers.
+
+Raw samples are appended as fixed-width (float64 timestamp, float32 lux)
+records to chunk files of chunk_size records each. Every chunk and tier
+file is read through numpy.memmap, so a range query only touches the
+pages it needs. Alongside the raw chunks, per-second, per-minute and
+per-hour buckets (min, max, sum, count) are kept up to date as samples
+are written, so long ranges are plotted from a tier instead of the raw
+data. Timestamps are expected to arrive in increasing order.
+"""
+import glob
+import os
+import threading
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+RAW = np.dtype([("t", "<f8"), ("lux", "<f4")])
+TIER = np.dtype(
+    [("t", "<f8"), ("min", "<f4"), ("max", "<f4"), ("sum", "<f8"), ("count", "<u4")]
+)
+TIERS = (("second", 1), ("minute", 60), ("hour", 3600))
+
+
+class SensorArchive:
+    def __init__(
+        self,
+        path="sensor_archive",
+        chunk_size=1 << 20,
+        batch_size=4096,
+        flush_interval=1,
+    ):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+        # samples not yet written
+        self.pending = np.zeros(batch_size, dtype=RAW)
+        self.pending_count = 0
+        self.last_flush = 0
+
+        self.chunks = sorted(glob.glob(os.path.join(path, "raw-*.bin")))
+        self.chunk_starts = [self.read(chunk, RAW)["t"][0] for chunk in self.chunks]
+        self.full_chunks = {}
+
+        # the newest bucket of each tier stays in memory until it's complete
+        self.open_buckets = {}
+        for name, _ in TIERS:
+            self.open_buckets[name] = self.reopen_bucket(self.tier_path(name))
+
+    def tier_path(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    @staticmethod
+    def read(path, dtype):
+        count = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+    @staticmethod
+    def reopen_bucket(path):
+        """
+        close() writes out unfinished buckets; take the last one back so
+        new samples in the same bucket are merged into it.
+        """
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size < TIER.itemsize:
+            return None
+        with open(path, "rb+") as file:
+            file.seek(size - TIER.itemsize)
+            bucket = np.frombuffer(file.read(TIER.itemsize), dtype=TIER).copy()
+            file.truncate(size - TIER.itemsize)
+        return bucket
+
+    # --- writing --- #
+
+    def add(self, timestamp, lux):
+        """
+        Buffer one sample (called on the sensor thread).
+        """
+        with self.lock:
+            self.pending[self.pending_count] = (timestamp, lux)
+            self.pending_count += 1
+            if (
+                self.pending_count < len(self.pending)
+                and timestamp - self.last_flush < self.flush_interval
+            ):
+                return
+            self.last_flush = timestamp
+            batch = self.pending[: self.pending_count].copy()
+            self.pending_count = 0
+            self.write(batch)
+
+    def extend(self, times, lux):
+        """
+        Write many samples at once, e.g. an import of recorded data.
+        """
+        batch = np.zeros(len(times), dtype=RAW)
+        batch["t"] = times
+        batch["lux"] = lux
+        with self.lock:
+            self.write(batch)
+
+    def flush(self):
+        with self.lock:
+            batch = self.pending[: self.pending_count].copy()
+            self.pending_count = 0
+            self.write(batch)
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            for name, _ in TIERS:
+                if self.open_buckets[name] is not None:
+                    self.append(self.tier_path(name), self.open_buckets[name])
+                    self.open_buckets[name] = None
+
+    def write(self, batch):
+        if not len(batch):
+            return
+        self.write_raw(batch)
+        for name, width in TIERS:
+            self.write_tier(name, width, batch)
+
+    @staticmethod
+    def append(path, records):
+        with open(path, "ab") as file:
+            records.tofile(file)
+
+    def write_raw(self, batch):
+        while len(batch):
+            count = (
+                os.path.getsize(self.chunks[-1]) // RAW.itemsize if self.chunks else 0
+            )
+            if not self.chunks or count == self.chunk_size:
+                chunk = os.path.join(self.path, f"raw-{len(self.chunks):06d}.bin")
+                self.chunks.append(chunk)
+                self.chunk_starts.append(batch["t"][0])
+                count = 0
+
+            space = self.chunk_size - count
+            self.append(self.chunks[-1], batch[:space])
+            batch = batch[space:]
+
+    def write_tier(self, name, width, batch):
+        buckets = np.floor(batch["t"] / width)
+        starts = np.r_[0, np.flatnonzero(np.diff(buckets)) + 1]
+        lux = batch["lux"]
+
+        records = np.zeros(len(starts), dtype=TIER)
+        records["t"] = buckets[starts] * width
+        records["min"] = np.minimum.reduceat(lux, starts)
+        records["max"] = np.maximum.reduceat(lux, starts)
+        records["sum"] = np.add.reduceat(lux.astype(np.float64), starts)
+        records["count"] = np.diff(np.r_[starts, len(lux)])
+
+        bucket = self.open_buckets[name]
+        if bucket is not None:
+            if bucket["t"][0] == records["t"][0]:
+                records["min"][0] = min(records["min"][0], bucket["min"][0])
+                records["max"][0] = max(records["max"][0], bucket["max"][0])
+                records["sum"][0] += bucket["sum"][0]
+                records["count"][0] += bucket["count"][0]
+            else:
+                self.append(self.tier_path(name), bucket)
+
+        self.append(self.tier_path(name), records[:-1])
+        self.open_buckets[name] = records[-1:].copy()
+
+    # --- reading --- #
+
+    def chunk(self, index):
+        # every chunk but the last is complete and can stay mapped
+        if index in self.full_chunks:
+            return self.full_chunks[index]
+        records = self.read(self.chunks[index], RAW)
+        if len(records) == self.chunk_size:
+            self.full_chunks[index] = records
+        return records
+
+    @staticmethod
+    def search(records, value, right=False):
+        """
+        Binary search over mapped records' timestamps. np.searchsorted would
+        copy the whole strided "t" field; this only reads the pages visited.
+        """
+        return (bisect_right if right else bisect_left)(records["t"], value)
+
+    def spans(self, start, end):
+        """
+        (chunk index, low, high) record ranges covering [start, end).
+        Chunks entirely inside the range aren't searched.
+        """
+        spans = []
+        first = max(bisect_right(self.chunk_starts, start) - 1, 0)
+        for index in range(first, len(self.chunks)):
+            if self.chunk_starts[index] >= end:
+                break
+            records = self.chunk(index)
+            low = (
+                0 if self.chunk_starts[index] >= start else self.search(records, start)
+            )
+            if index + 1 < len(self.chunks) and self.chunk_starts[index + 1] < end:
+                high = len(records)
+            else:
+                high = self.search(records, end)
+            spans.append((index, low, high))
+        return spans
+
+    def pending_in(self, start, end):
+        pending = self.pending[: self.pending_count]
+        return pending[(pending["t"] >= start) & (pending["t"] < end)]
+
+    def raw(self, start, end):
+        """
+        Raw samples with start <= t < end, as one RAW array.
+        """
+        with self.lock:
+            parts = [
+                np.array(self.chunk(index)[low:high])
+                for index, low, high in self.spans(start, end)
+            ]
+            parts.append(self.pending_in(start, end))
+        return np.concatenate(parts)
+
+    def count(self, start, end):
+        with self.lock:
+            total = sum(high - low for _, low, high in self.spans(start, end))
+            return total + len(self.pending_in(start, end))
+
+    def tier(self, name, start, end):
+        """
+        Buckets of one tier overlapping [start, end), as one TIER array.
+        """
+        first = start - dict(TIERS)[name]
+        with self.lock:
+            records = self.read(self.tier_path(name), TIER)
+            low = self.search(records, first, right=True)
+            high = self.search(records, end)
+            parts = [np.array(records[low:high])]
+
+            bucket = self.open_buckets[name]
+            if bucket is not None and first < bucket["t"][0] < end:
+                parts.append(bucket.copy())
+        return np.concatenate(parts)
+
+    def query(self, start, end, max_points=2000):
+        """
+        The finest data for [start, end) that fits in max_points.
+        Returns (t, min, max, mean) arrays; raw samples have min == max.
+        """
+        if self.count(start, end) <= max_points:
+            records = self.raw(start, end)
+            lux = records["lux"]
+            return records["t"], lux, lux, lux
+
+        for name, width in TIERS:
+            if (end - start) / width <= max_points or name == TIERS[-1][0]:
+                records = self.tier(name, start, end)
+                mean = (records["sum"] / np.maximum(records["count"], 1)).astype(
+                    np.float32
+                )
+                return records["t"], records["min"], records["max"], mean
@@ -0,0 +1,454 @@
+"""
+Bulk Vitamin D for exposure exports, without the UI:
+
+    python batch.py exposures.csv -o readings.csv
+    python batch.py exposures.jsonl -o - --chunk-size 100000 > readings.jsonl
+
+Input is CSV with a header row or JSON lines, read from a file or "-"
+for stdin. Each exposure has a start_time and end_time ("HH:MM"), a
+location (an address, "lat,lng", or empty for the saved location), the
+body exposed (a body mask or part names joined by "|"), skin_type and
+age, and optionally the day (dd-mm-yyyy, default today) for the diurnal
+curve and the timezone (IANA name) or utc_offset (minutes ahead of UTC)
+the times are in, by default the longitude's nominal zone. Like the LOG
+view, the UV peak is today's clear-sky forecast.
+
+Rows are read and written chunk_size at a time, so memory stays flat
+however long the file is. Addresses, forecasts and body parts are
+resolved once per distinct value for the whole run ("lat,lng" text once
+per chunk, it's often different on every row), and the readings of
+a chunk are computed together with calculator.calculate_vitamin_d_batch.
+Output has the input's format with "reading" and "uvi" added, plus an
+"error" for rows that couldn't be computed.
+"""
+import argparse
+import contextlib
+import csv
+import gc
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from itertools import islice, repeat
+from operator import itemgetter
+
+import numpy as np
+
+import calculator
+import forecast
+import geocode
+import records
+import solar
+from data import UserData
+import headless
+from headless import age, body_mask, seconds_of_day, skin_type, use_headless_forecast
+
+# field -> accepted column names
+COLUMNS = {
+    "start_time": ("start_time", "start"),
+    "end_time": ("end_time", "end"),
+    "location": ("location",),
+    "body": ("body", "body_parts"),
+    "skin_type": ("skin_type",),
+    "age": ("age",),
+    "day": ("day", "date"),
+    "timezone": ("timezone",),
+    "utc_offset": ("utc_offset",),
+}
+FIELDS = tuple(COLUMNS)
+REQUIRED = ("start_time", "end_time", "body", "skin_type", "age")
+# code of values not parsed yet, -1 is an invalid one
+UNSEEN = -2
+
+
+class Resolver:
+    """
+    Lookups shared by every chunk of a run. Each distinct value of a column
+    is parsed once into a code, -1 when it's invalid; places and days get
+    ids, and every place's peak UVI is fetched once. Locations only keep
+    their geocoded addresses between chunks.
+    """
+
+    def __init__(self, default_location=None, workers=8):
+        self.default_location = default_location
+        self.workers = workers
+        self.tables = {field: {} for field in FIELDS if field != "location"}
+        self.errors = {}
+        # address -> place id, -1 when it wasn't found
+        self.addresses = {}
+        # this chunk's location errors
+        self.location_errors = {}
+        self.places = []
+        self.place_ids = {}
+        self.peaks = []
+        self.days = []
+        self.day_ids = {}
+        # timezone names and offsets of either column, None for neither
+        self.zones = [None]
+        self.zone_ids = {None: 0}
+
+    def codes(self, field, values, parse):
+        table = self.tables[field]
+        codes = np.fromiter(
+            map(table.get, values, repeat(UNSEEN)), np.int64, len(values)
+        )
+        unseen = np.flatnonzero(codes == UNSEEN)
+        if not len(unseen):
+            return codes
+
+        for value in {values[index] for index in unseen.tolist()}:
+            try:
+                table[value] = parse(value)
+            except (ValueError, TypeError, AttributeError) as error:
+                table[value] = -1
+                self.errors[field, value] = (
+                    f"missing {field}" if value == "" else str(error)
+                ) or type(error).__name__
+        codes[unseen] = [table[values[index]] for index in unseen.tolist()]
+        return codes
+
+    def error(self, field, value):
+        if field == "location":
+            return self.location_errors.get(value)
+        return self.errors.get((field, value))
+
+    def place_id(self, place):
+        # rounded the way the forecast cache keys them
+        place = (round(float(place[0]), 2), round(float(place[1]), 2))
+        if place not in self.place_ids:
+            self.place_ids[place] = len(self.places)
+            self.places.append(place)
+            self.peaks.append(None)
+        return self.place_ids[place]
+
+    def location(self, text):
+        text = str(text).strip()
+        if not text:
+            if self.default_location is None:
+                raise ValueError("no location and no saved location")
+            return self.place_id(self.default_location)
+        place = text.split(",")
+        if len(place) != 2:
+            raise LookupError
+        try:
+            return self.place_id(place)
+        except ValueError:
+            raise LookupError
+
+    def locations(self, values):
+        """
+        Place ids for a column of "lat,lng" text, addresses or blanks.
+        Addresses new to the run are geocoded together; ones that failed
+        to look up are tried again with the next chunk.
+        """
+        codes = {}
+        self.location_errors = errors = {}
+        addresses = []
+        for text in set(values):
+            if text in self.addresses:
+                codes[text] = self.addresses[text]
+                if codes[text] < 0:
+                    errors[text] = "location not found"
+                continue
+            try:
+                codes[text] = self.location(text)
+            except LookupError:
+                addresses.append(text)
+            except (ValueError, TypeError, AttributeError) as error:
+                codes[text] = -1
+                errors[text] = "missing location" if text == "" else str(error)
+
+        if addresses:
+            # geocode prints misses, keep them out of the output
+            try:
+                with contextlib.redirect_stdout(sys.stderr):
+                    found = geocode.get_geocoder().lookup_many(addresses)
+            except Exception as error:
+                print(f"Geocoding failed: {error}", file=sys.stderr)
+                found = getattr(error, "found", {})
+            for address in addresses:
+                if address not in found:
+                    codes[address] = -1
+                    errors[address] = "geocoding failed"
+                    continue
+                place = self.place_id(found[address]) if found[address] else -1
+                codes[address] = self.addresses[address] = place
+                if place < 0:
+                    errors[address] = "location not found"
+
+        return np.fromiter(map(codes.__getitem__, values), np.int64, len(values))
+
+    def day(self, text):
+        text = str(text).strip()
+        day = datetime.strptime(text, "%d-%m-%Y").date() if text else date.today()
+        if day not in self.day_ids:
+            self.day_ids[day] = len(self.days)
+            self.days.append(day)
+        return self.day_ids[day]
+
+    def zone(self, name="", minutes=""):
+        zone = headless.zone(str(name).strip(), str(minutes).strip())
+        if zone not in self.zone_ids:
+            self.zone_ids[zone] = len(self.zones)
+            self.zones.append(zone)
+        return self.zone_ids[zone]
+
+    def fetch_peaks(self, place_ids):
+        missing = [place for place in place_ids if self.peaks[place] is None]
+        if not missing:
+            return
+
+        def peak(place):
+            try:
+                return float(forecast.get_client().uvi(self.places[place])[1][0])
+            except Exception as error:
+                print(
+                    f"No UV forecast for {self.places[place]}: {error}", file=sys.stderr
+                )
+                return np.nan
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for place, value in zip(missing, executor.map(peak, missing)):
+                self.peaks[place] = value
+
+
+class CsvFormat:
+    def __init__(self, infile, outfile):
+        self.reader = csv.reader(infile)
+        header = next(self.reader, None)
+        if header is None:
+            raise SystemExit("no header row")
+        self.indexes = [column_index(header, field) for field in FIELDS]
+        self.getters = [
+            itemgetter(index) if index is not None else None for index in self.indexes
+        ]
+        self.width = len(header)
+        self.writer = csv.writer(outfile, lineterminator="\n")
+        self.writer.writerow(header + ["reading", "uvi", "error"])
+
+    def columns(self, rows):
+        if min(map(len, rows)) < self.width:
+            # short rows read as blanks
+            padding = [""] * self.width
+            for row in rows:
+                row.extend(padding[len(row) :])
+        blank = [""] * len(rows)
+        return [
+            list(map(getter, rows)) if getter is not None else blank
+            for getter in self.getters
+        ]
+
+    def rows(self):
+        return self.reader
+
+    def write(self, rows, readings, uvi, errors):
+        for row, reading, value, error in zip(rows, readings, uvi, errors):
+            row += (reading, value, error)
+        self.writer.writerows(rows)
+
+
+class BadLine(dict):
+    """
+    A JSON line that didn't parse into an object, written back as its text
+    and the error.
+    """
+
+
+class JsonlFormat:
+    def __init__(self, infile, outfile):
+        self.infile = infile
+        self.outfile = outfile
+
+    @staticmethod
+    def value(record, names):
+        value = next((record[name] for name in names if name in record), None)
+        if value is None:
+            return ""
+        if isinstance(value, dict):
+            # the tracker's own {part: exposed} bodies
+            return records.body_to_mask(value)
+        if isinstance(value, list):
+            return "|".join(map(str, value))
+        return value
+
+    def columns(self, rows):
+        return [
+            [self.value(record, names) for record in rows] for names in COLUMNS.values()
+        ]
+
+    def rows(self):
+        for number, line in enumerate(self.infile, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                yield BadLine(line=line.rstrip("\n"), error=f"line {number}: {error}")
+                continue
+            if isinstance(record, dict):
+                yield record
+            else:
+                error = f"line {number}: not a JSON object"
+                yield BadLine(line=line.rstrip("\n"), error=error)
+
+    def write(self, rows, readings, uvi, errors):
+        lines = []
+        for record, reading, value, error in zip(rows, readings, uvi, errors):
+            if error:
+                # a bad line keeps its own error over the missing fields
+                if not isinstance(record, BadLine):
+                    record["error"] = error
+            else:
+                record["reading"] = reading
+                record["uvi"] = value
+            lines.append(json.dumps(record))
+        lines.append("")
+        self.outfile.write("\n".join(lines))
+
+
+def column_index(header, field):
+    for name in COLUMNS[field]:
+        if name in header:
+            return header.index(name)
+    if field in REQUIRED:
+        raise SystemExit(f"missing column {COLUMNS[field][0]!r}")
+    return None
+
+
+def compute_chunk(columns, resolver):
+    """
+    Readings, effective UVI and error messages for one chunk, given its
+    columns in FIELDS order. Rows that can't be computed get an error
+    instead of a reading.
+    """
+    values = dict(zip(FIELDS, columns))
+    codes = {
+        "start_time": resolver.codes(
+            "start_time", values["start_time"], seconds_of_day
+        ),
+        "end_time": resolver.codes("end_time", values["end_time"], seconds_of_day),
+        "location": resolver.locations(values["location"]),
+        "body": resolver.codes("body", values["body"], body_mask),
+        "skin_type": resolver.codes("skin_type", values["skin_type"], skin_type),
+        "age": resolver.codes("age", values["age"], age),
+        "day": resolver.codes("day", values["day"], resolver.day),
+        "timezone": resolver.codes("timezone", values["timezone"], resolver.zone),
+        "utc_offset": resolver.codes(
+            "utc_offset", values["utc_offset"], lambda text: resolver.zone("", text)
+        ),
+    }
+    count = len(columns[0])
+    errors = [""] * count
+    for field, code in codes.items():
+        for index in np.flatnonzero(code < 0).tolist():
+            if not errors[index]:
+                errors[index] = resolver.error(field, values[field][index])
+    valid = np.array([not error for error in errors], dtype=bool)
+
+    starts = codes["start_time"]
+    durations = np.abs(codes["end_time"] - starts)
+    places = codes["location"]
+    resolver.fetch_peaks(np.unique(places[valid]).tolist())
+
+    # a timezone name wins over an offset
+    zones = np.where(codes["timezone"] > 0, codes["timezone"], codes["utc_offset"])
+
+    # one pass over the solar curve per place, day and zone
+    uvi = np.zeros(count)
+    rows = np.flatnonzero(valid)
+    groups = (places[rows] * len(resolver.days) + codes["day"][rows]) * len(
+        resolver.zones
+    ) + zones[rows]
+    order = np.argsort(groups, kind="stable")
+    rows, groups = rows[order], groups[order]
+    bounds = np.flatnonzero(np.diff(groups)) + 1
+    for group in np.split(rows, bounds):
+        if not len(group):
+            continue
+        place = places[group[0]]
+        day = resolver.days[codes["day"][group[0]]]
+        gps = resolver.places[place]
+        utc_offset = headless.utc_offset(gps, day, resolver.zones[zones[group[0]]])
+        uvi[group] = resolver.peaks[place] * solar.interval_fractions(
+            gps, day, starts[group], durations[group], utc_offset
+        )
+    for index in np.flatnonzero(valid & np.isnan(uvi)).tolist():
+        errors[index] = "UV forecast unavailable"
+    uvi[~valid | np.isnan(uvi)] = 0
+
+    readings = calculator.calculate_vitamin_d_batch(
+        durations,
+        np.maximum(codes["body"], 0),
+        uvi,
+        np.clip(codes["skin_type"], 1, 6).astype(str),
+        np.maximum(codes["age"], 0),
+    )
+    readings, uvi = readings.tolist(), np.round(uvi, 4).tolist()
+    for index, error in enumerate(errors):
+        if error:
+            readings[index] = uvi[index] = None
+    return readings, uvi, errors
+
+
+def run(infile, outfile, file_format, chunk_size, resolver):
+    output = (CsvFormat if file_format == "csv" else JsonlFormat)(infile, outfile)
+    rows = iter(output.rows())
+    total = failed = 0
+    # every row of a chunk is a fresh container the cycle collector would
+    # keep walking, and none of them can form cycles
+    gc.disable()
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            readings, uvi, errors = compute_chunk(output.columns(chunk), resolver)
+            output.write(chunk, readings, uvi, errors)
+            total += len(chunk)
+            failed += len(chunk) - errors.count("")
+    finally:
+        gc.enable()
+    return total, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input", help='CSV or JSONL file, "-" for stdin')
+    parser.add_argument("-o", "--output", default="-", help='"-" for stdout')
+    parser.add_argument("--format", choices=("csv", "jsonl"))
+    parser.add_argument("--chunk-size", type=int, default=65536)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    file_format = args.format
+    if file_format is None:
+        file_format = "jsonl" if args.input.endswith((".jsonl", ".json")) else "csv"
+
+    use_headless_forecast()
+    user_data = UserData().data
+    resolver = Resolver(
+        tuple(user_data["location"][1]) if user_data else None, args.workers
+    )
+
+    started = time.perf_counter()
+    infile = sys.stdin if args.input == "-" else open(args.input, newline="")
+    outfile = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    try:
+        total, failed = run(infile, outfile, file_format, args.chunk_size, resolver)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"{total} rows ({failed} failed) in {elapsed:.1f} s,"
+        f" {total / max(elapsed, 1e-9):.0f} rows/s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+SensorArchive at scale: writes --days of --rate Hz samples, then times
+range queries at different spans and reports how much memory they take
+compared with the data on disk.
+
+Run from the repository root:
+    python benchmarks/bench_archive.py
+    python benchmarks/bench_archive.py --days 30 --rate 10
+"""
+import argparse
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archive import SensorArchive
+
+DAY = 86400
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--rate", type=float, default=10)
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp()
+    archive = SensorArchive(path)
+    start = 1_700_000_000.0
+
+    # write a day at a time, like a long import
+    started = time.perf_counter()
+    rng = np.random.default_rng(0)
+    written = 0
+    for day in range(int(np.ceil(args.days))):
+        times = start + day * DAY + np.arange(0, DAY, 1 / args.rate)
+        times = times[times < start + args.days * DAY]
+        lux = 50000 * np.clip(np.sin((times % DAY) / DAY * 2 * np.pi), 0, None)
+        lux += rng.normal(0, 500, len(times))
+        archive.extend(times, lux.astype(np.float32))
+        written += len(times)
+    archive.close()
+    elapsed = time.perf_counter() - started
+
+    on_disk = sum(entry.stat().st_size for entry in os.scandir(path)) / 2**20
+    print(f"wrote {written} samples in {elapsed:.1f} s, {on_disk:.0f} MB on disk")
+
+    # reopen cold, the way the app does on start
+    archive = SensorArchive(path)
+    rss_before = rss_mb()
+    end = start + args.days * DAY
+    for label, span in (
+        ("10 minutes", 600),
+        ("1 hour", 3600),
+        ("1 day", DAY),
+        ("whole archive", end - start),
+    ):
+        query_start = end - span
+        began = time.perf_counter()
+        t, low, high, mean = archive.query(query_start, end, max_points=2000)
+        took = (time.perf_counter() - began) * 1000
+        print(f"{label:<14} {len(t):5d} points in {took:7.2f} ms")
+    print(f"max RSS growth during queries {rss_mb() - rss_before:.1f} MB")
+
+    shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
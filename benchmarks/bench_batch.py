@@ -0,0 +1,66 @@
+"""
+Recomputing a history entry by entry (VitaminDTracker's scalar path)
+against calculator.calculate_vitamin_d_batch, and checking both agree.
+
+Run from the repository root:
+    python benchmarks/bench_batch.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calculator
+import constants
+from records import mask_to_body
+
+ENTRIES = 50_000
+
+
+def scalar_bsa(body, age):
+    group = calculator.AGE_GROUPS[int(calculator.age_group_index(age))]
+    total_surface = 0
+    for pos, value in body.items():
+        if value:
+            total_surface += constants.body_surface_area[group][pos]
+    return total_surface / 100
+
+
+def main():
+    rng = np.random.default_rng(0)
+    durations = rng.integers(60, 4 * 3600, ENTRIES)
+    masks = rng.integers(0, 1 << len(constants.body_parts), ENTRIES)
+    uvi = rng.uniform(0, 8, ENTRIES)
+    skin_types = rng.choice(list(constants.med), ENTRIES)
+    ages = rng.integers(0, 90, ENTRIES)
+
+    bodies = [mask_to_body(int(mask)) for mask in masks]
+    start = time.perf_counter()
+    scalar = [
+        int(
+            calculator.holick(
+                float(uvi[i]),
+                int(durations[i]),
+                scalar_bsa(bodies[i], int(ages[i])),
+                constants.med[skin_types[i]],
+            )
+        )
+        for i in range(ENTRIES)
+    ]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = calculator.calculate_vitamin_d_batch(durations, masks, uvi, skin_types, ages)
+    batch_time = time.perf_counter() - start
+
+    print(f"{ENTRIES} entries")
+    print(f"scalar: {scalar_time * 1000:8.1f} ms")
+    print(f"batch:  {batch_time * 1000:8.1f} ms")
+    print("identical:", bool(np.array_equal(batch, scalar)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+batch.py over a generated export: writes --rows exposures spread over
+--places locations, copies the file through the csv module alone as the
+floor, then runs batch.run on a tenth of it and on all of it. Reports rows
+per second, peak memory after each run and how many forecasts were
+fetched. --gps-per-row gives every row its own coordinates close to one
+of the places, like a phone's export.
+
+The forecast client is set up the way batch.main() does it; only the
+network call is replaced by a fixed clear-sky peak, unless --live is
+given. Run from the repository root:
+    python benchmarks/bench_batch_cli.py
+    python benchmarks/bench_batch_cli.py --rows 5000000 --chunk-size 100000
+    python benchmarks/bench_batch_cli.py --gps-per-row
+"""
+import argparse
+import csv
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch
+import constants
+import forecast
+
+
+class FixedApi:
+    """
+    Stands in for openmeteo_requests.Client: UV index max 4 and clear-sky
+    max 5 for every day.
+    """
+
+    def __init__(self):
+        self.fetches = 0
+
+    def weather_api(self, url, params):
+        self.fetches += 1
+        return [self]
+
+    def Daily(self):
+        return self
+
+    def Variables(self, index):
+        return FixedVariable(5.0 if index else 4.0)
+
+
+class FixedVariable:
+    def __init__(self, value):
+        self.value = value
+
+    def ValuesAsNumpy(self):
+        return np.full(7, self.value, dtype=np.float32)
+
+
+class FixedClient(forecast.ForecastClient):
+    def __init__(self):
+        # as batch.main() configures it
+        super().__init__(saved_path=None)
+        self.client = FixedApi()
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def near(rng, location):
+    # a GPS fix within a few hundred metres
+    lat, lng = map(float, location.split(","))
+    lat += rng.uniform(-0.004, 0.004)
+    lng += rng.uniform(-0.004, 0.004)
+    return f"{lat:.6f},{lng:.6f}"
+
+
+def write_export(path, rows, places, gps_per_row=False):
+    rng = random.Random(0)
+    locations = [
+        f"{rng.uniform(-60, 60):.2f},{rng.uniform(-180, 180):.2f}"
+        for _ in range(places)
+    ]
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(
+            ["start_time", "end_time", "location", "body", "skin_type", "age"]
+        )
+        for index in range(rows):
+            start = rng.randint(6 * 60, 19 * 60)
+            end = min(start + rng.randint(1, 120), 24 * 60 - 1)
+            if index % 2:
+                body = rng.randint(0, (1 << 15) - 1)
+            else:
+                body = "|".join(rng.sample(constants.body_parts, 3))
+            location = rng.choice(locations)
+            writer.writerow(
+                [
+                    f"{start // 60:02d}:{start % 60:02d}",
+                    f"{end // 60:02d}:{end % 60:02d}",
+                    near(rng, location) if gps_per_row else location,
+                    body,
+                    rng.randint(1, 6),
+                    rng.randint(1, 80),
+                ]
+            )
+
+
+def copy_csv(source, target):
+    started = time.perf_counter()
+    with open(source, newline="") as infile, open(target, "w", newline="") as outfile:
+        csv.writer(outfile, lineterminator="\n").writerows(csv.reader(infile))
+    return time.perf_counter() - started
+
+
+def run_batch(source, target, chunk_size):
+    started = time.perf_counter()
+    with open(source, newline="") as infile, open(target, "w", newline="") as outfile:
+        resolver = batch.Resolver()
+        total, failed = batch.run(infile, outfile, "csv", chunk_size, resolver)
+    return total, failed, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--places", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=65536)
+    parser.add_argument("--gps-per-row", action="store_true")
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    api = None
+    if args.live:
+        forecast.set_client(forecast.ForecastClient(saved_path=None))
+    else:
+        client = FixedClient()
+        api = client.client
+        forecast.set_client(client)
+
+    path = tempfile.mkdtemp()
+    source = os.path.join(path, "exposures.csv")
+    head = os.path.join(path, "head.csv")
+    target = os.path.join(path, "readings.csv")
+    try:
+        write_export(source, args.rows, args.places, args.gps_per_row)
+        with open(source) as infile, open(head, "w") as outfile:
+            for line in range(args.rows // 10 + 1):
+                outfile.write(infile.readline())
+        size = os.path.getsize(source) / 2**20
+        print(f"{args.rows} rows, {size:.0f} MB, {args.places} places")
+
+        took = copy_csv(source, target)
+        print(f"csv copy only        {took:6.1f} s {args.rows / took:9.0f} rows/s")
+
+        for label, file in (
+            ("batch, first tenth", head),
+            ("batch, everything", source),
+        ):
+            if api:
+                api.fetches = 0
+            total, failed, took = run_batch(file, target, args.chunk_size)
+            print(
+                f"{label:<20} {took:6.1f} s {total / took:9.0f} rows/s"
+                f"  {failed} failed  peak RSS {rss_mb():.0f} MB"
+                + (f"  {api.fetches} forecasts" if api else "")
+            )
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
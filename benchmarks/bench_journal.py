@@ -0,0 +1,100 @@
+"""
+Submit latency vs. history size: full entries.json rewrite (the old
+backup() path) against the append-only journal. Journal submits go through
+JsonEntryStore with compaction on, enough of them to compact twice, and
+both the mean and the worst submit are reported.
+
+Run from the repository root:
+    python benchmarks/bench_journal.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import JournalStore, JsonEntryStore
+
+BODY = {
+    "head": True,
+    "neck": True,
+    "left_arm_upper": False,
+    "left_arm_lower": True,
+    "left_palm": True,
+    "right_arm_upper": False,
+    "right_arm_lower": True,
+    "right_palm": True,
+    "torso": False,
+    "left_leg_upper": False,
+    "left_leg_lower": False,
+    "left_feet": False,
+    "right_leg_upper": False,
+    "right_leg_lower": False,
+    "right_feet": False,
+}
+SUBMITS = 10
+# twice the default compact_every
+JOURNAL_SUBMITS = 1000
+
+
+def make_history(n_entries, per_day=5):
+    entries = {}
+    for i in range(n_entries):
+        day = f"{1 + (i // per_day) % 28:02d}-{1 + (i // (per_day * 28)) % 12:02d}-{2000 + i // (per_day * 28 * 12)}"
+        entries.setdefault(day, {})[f"{8 + i % per_day:02d}:00"] = {
+            "duration": "1800",
+            "reading": "420",
+            "location": "Trinity College Dublin",
+            "body": BODY,
+        }
+    return entries
+
+
+def bench_rewrite(path, entries):
+    start = time.perf_counter()
+    for i in range(SUBMITS):
+        entries["bench"] = {str(i): entries[next(iter(entries))]}
+        with open(path, "w") as file:
+            file.write(json.dumps(entries, indent=4))
+    elapsed = (time.perf_counter() - start) / SUBMITS
+    del entries["bench"]
+    return elapsed
+
+
+def bench_journal(directory, entries):
+    journal = JournalStore(
+        os.path.join(directory, "entries.json"),
+        os.path.join(directory, "entries.journal"),
+    )
+    journal.compact(entries)
+    store = JsonEntryStore(journal)
+    store.load()
+    entry = entries[next(iter(entries))]
+    entry = entry[next(iter(entry))]
+
+    latencies = []
+    for i in range(JOURNAL_SUBMITS):
+        start = time.perf_counter()
+        store.add_entry("bench", str(i), entry)
+        latencies.append(time.perf_counter() - start)
+    store.close()
+    return sum(latencies) / len(latencies), max(latencies)
+
+
+def main():
+    print(f"{'entries':>10} {'rewrite ms':>12} {'journal ms':>12} {'worst ms':>10}")
+    for n_entries in (1_000, 10_000, 50_000, 100_000):
+        entries = make_history(n_entries)
+        with tempfile.TemporaryDirectory() as directory:
+            rewrite = bench_rewrite(os.path.join(directory, "full.json"), entries)
+            journal, worst = bench_journal(directory, entries)
+        print(
+            f"{n_entries:>10} {rewrite * 1000:>12.2f} {journal * 1000:>12.3f}"
+            f" {worst * 1000:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Resident size of a 100k-entry history: entries.json parsed into the old
+string-valued dicts against JsonEntryStore's compact Entry records.
+
+Run from the repository root:
+    python benchmarks/bench_memory.py
+"""
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import constants
+from storage import JournalStore, JsonEntryStore
+
+ENTRIES = 100_000
+LOCATIONS = ["Trinity College Dublin", "Phoenix Park", "Howth", "Bray", "Malahide"]
+
+
+def make_snapshot(n_entries, per_day=5):
+    entries = {}
+    for i in range(n_entries):
+        day_number = i // per_day
+        day = f"{1 + day_number % 28:02d}-{1 + day_number // 28 % 12:02d}-{2000 + day_number // 336}"
+        entries.setdefault(day, {})[f"{8 + i % per_day:02d}:{i % 60:02d}"] = {
+            "duration": str(300 + i % 3600),
+            "reading": str(i % 2000),
+            "location": LOCATIONS[i % len(LOCATIONS)],
+            "body": {
+                part: bool(i >> bit & 1) for bit, part in enumerate(constants.body_parts)
+            },
+        }
+    return json.dumps(entries)
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    snapshot = make_snapshot(ENTRIES)
+
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, "entries.json")
+        with open(snapshot_path, "w") as file:
+            file.write(snapshot)
+
+        _, dict_size = measure(lambda: json.loads(snapshot))
+
+        def load_store():
+            store = JsonEntryStore(
+                JournalStore(snapshot_path, os.path.join(directory, "entries.journal"))
+            )
+            store.load()
+            return store
+
+        _, store_size = measure(load_store)
+
+    print(f"{ENTRIES} entries")
+    print(f"string-valued dicts: {dict_size / 2**20:8.1f} MiB ({dict_size / ENTRIES:6.0f} B/entry)")
+    print(f"Entry records:       {store_size / 2**20:8.1f} MiB ({store_size / ENTRIES:6.0f} B/entry)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Sensor ingestion throughput: a ReplaySource pushed at a fixed rate through
+SensorReader, counting samples kept up with, GUI signals received and
+memory growth while the ring buffer wraps.
+
+Run from the repository root:
+    python benchmarks/bench_sensor.py
+    python benchmarks/bench_sensor.py --rate 1000 --seconds 10
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PyQt6.QtCore import QCoreApplication, QTimer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sensor import ReplaySource, SensorReader
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=500)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--capacity", type=int, default=1 << 12)
+    args = parser.parse_args()
+
+    app = QCoreApplication([])
+
+    # one minute of a slowly varying light level
+    times = np.arange(0, 60, 1 / args.rate)
+    lux = 20000 + 5000 * np.sin(times / 10)
+    path = os.path.join(tempfile.mkdtemp(), "replay.csv")
+    np.savetxt(path, np.column_stack([times, lux]), delimiter=",", fmt="%.4f")
+
+    reader = SensorReader(ReplaySource(path, rate=args.rate), capacity=args.capacity)
+    signals = []
+    reader.updated.connect(lambda: signals.append(len(reader.buffer)))
+    reader.failed.connect(print)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    reader.start()
+    QTimer.singleShot(int(args.seconds * 1000), app.quit)
+    app.exec()
+    reader.stop()
+    elapsed = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(f"target rate      {args.rate:.0f} samples/s")
+    print(f"achieved rate    {reader.buffer.written / elapsed:.0f} samples/s")
+    print(f"samples          {reader.buffer.written} ({len(reader.buffer)} buffered)")
+    print(f"GUI signals      {len(signals)} ({len(signals) / elapsed:.1f}/s)")
+    print(f"max RSS growth   {(rss_after - rss_before) / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
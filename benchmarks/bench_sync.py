@@ -0,0 +1,214 @@
+"""
+EntrySync against a local DynamoDB stand-in: a first upload of --entries
+entries from one device, a pull of them on a second device, then a small
+edit going the other way, a conflict, an edit pushed an hour after it
+was made and one from a device whose clock runs ahead. A share of every
+batch is handed back as unprocessed to exercise the retries. Reports
+requests, items read and time per step. Pulls re-read the last few
+sequence numbers (EntrySync.overlap); --overlap changes how many.
+
+Needs moto (pip install "moto[dynamodb]"), or pass --endpoint to run
+against DynamoDB Local instead. Run from the repository root:
+    python benchmarks/bench_sync.py
+    python benchmarks/bench_sync.py --entries 10000 --unprocessed 0.3
+    python benchmarks/bench_sync.py --overlap 0
+    python benchmarks/bench_sync.py --endpoint http://localhost:8000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from PyQt6.QtCore import QCoreApplication, QThreadPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import VitaminDTracker
+from storage import JournalStore, JsonEntryStore
+from sync import DynamoRemote
+from workers import EntrySync
+
+
+class FlakyClient:
+    """
+    Passes calls through, but leaves a share of each batch unprocessed the
+    way DynamoDB does when it throttles.
+    """
+
+    def __init__(self, client, share):
+        self.client = client
+        self.share = share
+        self.calls = {}
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def batch_write_item(self, RequestItems):
+        self.count("batch_write_item")
+        ((table, requests),) = RequestItems.items()
+        kept = [request for request in requests if random.random() >= self.share]
+        if not kept:
+            kept, requests = requests[:1], requests
+        unprocessed = [request for request in requests if request not in kept]
+        self.client.batch_write_item(RequestItems={table: kept})
+        return {"UnprocessedItems": {table: unprocessed} if unprocessed else {}}
+
+    def query(self, **query):
+        self.count("query")
+        response = self.client.query(**query)
+        self.calls["items"] = self.calls.get("items", 0) + len(response["Items"])
+        return response
+
+
+def make_device(path, name, client):
+    os.makedirs(path)
+    store = JsonEntryStore(
+        JournalStore(
+            os.path.join(path, "entries.json"), os.path.join(path, "entries.journal")
+        )
+    )
+    tracker = VitaminDTracker(store)
+    remote = DynamoRemote("dsure", "bench", name, client=client, backoff=0.001)
+    return tracker, remote
+
+
+def run(sync, app):
+    started = time.perf_counter()
+    sync.sync()
+    while sync.task:
+        app.processEvents()
+        time.sleep(0.001)
+    return time.perf_counter() - started
+
+
+def entry(reading):
+    return {
+        "duration": "600",
+        "reading": str(reading),
+        "location": "Dublin",
+        "body": 3,
+        "uvi": 2.5,
+        "skin_type": "2",
+        "age": 30,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--unprocessed", type=float, default=0.2)
+    parser.add_argument("--endpoint")
+    parser.add_argument("--overlap", type=int, help="sequence numbers, see EntrySync")
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "local")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "local")
+    mock = None
+    if not args.endpoint:
+        from moto import mock_aws
+
+        mock = mock_aws()
+        mock.start()
+
+    import boto3
+
+    app = QCoreApplication([])
+    pool = QThreadPool()
+    client = FlakyClient(
+        boto3.client("dynamodb", endpoint_url=args.endpoint), args.unprocessed
+    )
+    root = tempfile.mkdtemp()
+    first, first_remote = make_device(os.path.join(root, "a"), "a", client)
+    second, second_remote = make_device(os.path.join(root, "b"), "b", client)
+    first_remote.create_table()
+
+    # a few entries a day going back from today
+    start = date.today() - timedelta(days=args.entries // 4)
+    items = []
+    for index in range(args.entries):
+        day = (start + timedelta(days=index // 4)).strftime("%d-%m-%Y")
+        items.append((day, f"{8 + index % 4 * 3:02d}:00", entry(100 + index % 500)))
+    first.add_entries(items)
+
+    if args.overlap is not None:
+        EntrySync.overlap = args.overlap
+    first_sync = EntrySync(first, first_remote, os.path.join(root, "a.json"), pool=pool)
+    second_sync = EntrySync(
+        second, second_remote, os.path.join(root, "b.json"), pool=pool
+    )
+
+    def step(label, sync):
+        client.calls = {}
+        took = run(sync, app)
+        writes = client.calls.get("batch_write_item", 0)
+        queries = client.calls.get("query", 0)
+        pulled = client.calls.get("items", 0)
+        print(
+            f"{label:<18} {took * 1000:6.0f} ms  {writes:4d} batch writes"
+            f"  {queries:2d} queries ({pulled:5d} items)"
+            f"  {len(sync.state['dirty']):4d} left dirty"
+        )
+
+    step("first upload (a)", first_sync)
+    step("first pull (b)", second_sync)
+    matches = sum(
+        second.get_entry(day, time) == first.get_entry(day, time)
+        for day, time, _ in items
+    )
+    print(f"  b has {matches}/{len(items)} entries from a")
+
+    # an edit on b goes back to a; b doesn't push what it pulled
+    day, time_, _ = items[-1]
+    second.add_entry(day, time_, entry(999))
+    step("delta push (b)", second_sync)
+    step("delta pull (a)", first_sync)
+    print(f"  a sees the edit: {first.get_entry(day, time_)['reading'] == '999'}")
+
+    # both sides change one entry; the later change wins everywhere
+    day, time_, _ = items[0]
+    first.add_entry(day, time_, entry(111))
+    time.sleep(0.01)
+    second.add_entry(day, time_, entry(222))
+    step("conflict push (a)", first_sync)
+    step("conflict push (b)", second_sync)
+    step("conflict pull (a)", first_sync)
+    print(
+        "  both keep the later edit:",
+        first.get_entry(day, time_)["reading"]
+        == second.get_entry(day, time_)["reading"]
+        == "222",
+    )
+
+    # an edit made offline an hour ago and pushed now still reaches b,
+    # which has synced since
+    day, time_, _ = items[1]
+    first.add_entry(day, time_, entry(333))
+    first_sync.state["dirty"][first_sync.key(day, time_)] -= 3600 * 1000
+    step("old edit push (a)", first_sync)
+    step("old edit pull (b)", second_sync)
+    print(f"  b sees the edit: {second.get_entry(day, time_)['reading'] == '333'}")
+
+    # b's clock runs an hour ahead; a's edits after it still reach b
+    day, time_, _ = items[2]
+    second.add_entry(day, time_, entry(444))
+    second_sync.state["dirty"][second_sync.key(day, time_)] += 3600 * 1000
+    step("skewed push (b)", second_sync)
+    day, time_, _ = items[3]
+    first.add_entry(day, time_, entry(555))
+    step("after skew (a)", first_sync)
+    step("after skew (b)", second_sync)
+    print(f"  b sees a's edit: {second.get_entry(day, time_)['reading'] == '555'}")
+
+    if mock:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
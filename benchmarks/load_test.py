@@ -0,0 +1,125 @@
+"""
+Load test for server.py: --connections keep-alive clients send --requests
+requests in total, spread over a few locations, and the script reports
+latency percentiles and requests per second per endpoint.
+
+Start the server first, then run from the repository root:
+    python server.py --port 8080
+    python benchmarks/load_test.py --port 8080
+    python benchmarks/load_test.py --connections 256 --requests 50000 --batch 1000
+
+Only /vitamin-d and /totals are hit unless --write is given, which also
+logs entries (saved into the server's entries for today).
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+
+import numpy as np
+
+PLACES = [(53.34, -6.25), (51.51, -0.13), (40.42, -3.70), (-33.87, 151.21)]
+
+
+def exposure(rng):
+    return {
+        "gps": list(rng.choice(PLACES)),
+        "start_time": f"{rng.randint(7, 18):02d}:{rng.randint(0, 59):02d}",
+        "duration": rng.randint(60, 3600),
+        "body": rng.randint(0, (1 << 15) - 1),
+        "skin_type": str(rng.randint(1, 6)),
+        "age": rng.randint(1, 80),
+    }
+
+
+def make_request(rng, args):
+    roll = rng.random()
+    if args.write and roll < 0.1:
+        start = rng.randint(7 * 60, 18 * 60)
+        body = {
+            "start_time": f"{start // 60:02d}:{start % 60:02d}",
+            "end_time": f"{(start + 20) // 60:02d}:{(start + 20) % 60:02d}",
+            "body": rng.randint(0, (1 << 15) - 1),
+        }
+        return "POST", "/entries", body
+    if roll < 0.3:
+        return "GET", "/totals", None
+    if args.batch and roll < 0.35:
+        return "POST", "/vitamin-d", {
+            "exposures": [exposure(rng) for _ in range(args.batch)]
+        }
+    return "POST", "/vitamin-d", exposure(rng)
+
+
+async def client(args, requests, results, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    try:
+        while requests:
+            requests.pop()
+            method, path, body = make_request(rng, args)
+            data = json.dumps(body).encode() if body is not None else b""
+            head = (
+                f"{method} {path} HTTP/1.1\r\nHost: {args.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n"
+            )
+
+            started = time.perf_counter()
+            writer.write(head.encode() + data)
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latency = time.perf_counter() - started
+
+            label = path if "exposures" not in (body or {}) else path + " (batch)"
+            results[label].append((latency, status))
+    finally:
+        writer.close()
+
+
+async def run(args):
+    requests = list(range(args.requests))
+    results = defaultdict(list)
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(client(args, requests, results, seed) for seed in range(args.connections))
+    )
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=0, help="exposures per batch")
+    parser.add_argument("--write", action="store_true")
+    args = parser.parse_args()
+
+    results, elapsed = asyncio.run(run(args))
+
+    everything = [item for items in results.values() for item in items]
+    print(
+        f"{len(everything)} requests over {args.connections} connections"
+        f" in {elapsed:.1f} s: {len(everything) / elapsed:.0f} requests/s"
+    )
+    print(f"{'endpoint':<22} {'count':>7} {'errors':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, items in sorted(results.items()) + [("all", everything)]:
+        latencies = np.array([latency for latency, _ in items]) * 1000
+        errors = sum(status != 200 for _, status in items)
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{label:<22} {len(items):7d} {errors:7d} {p50:8.2f} {p99:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Cold-start report: where import time goes, and how long app.py takes to
+first paint and to a fully drawn main view.
+
+app.py is started with `-X importtime --startup-report`, which makes it
+print its milestones and quit once the main view is ready. Each number is
+the median over --runs starts.
+
+Run from a directory holding the app's data files (entries.json,
+user_data.json, styles.css, img/), e.g. the repository root:
+    python benchmarks/startup_report.py
+    python benchmarks/startup_report.py --runs 10 --top 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def run_app():
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", APP, "--startup-report"],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+    milestones = {}
+    for line in result.stdout.splitlines():
+        if line.startswith("startup "):
+            _, name, ms = line.split()
+            milestones[name] = float(ms)
+    if "main_view_ready" not in milestones:
+        sys.exit(f"app.py did not report startup:\n{result.stdout}\n{result.stderr}")
+
+    # "import time: self [us] | cumulative | imported package", nested
+    # imports are indented two spaces per level
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if name[1:2] != " ":
+            imports[name.strip()] = int(cumulative) / 1000
+    return milestones, imports
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    milestones = defaultdict(list)
+    imports = defaultdict(list)
+    for _ in range(args.runs):
+        run_milestones, run_imports = run_app()
+        for name, ms in run_milestones.items():
+            milestones[name].append(ms)
+        for name, ms in run_imports.items():
+            imports[name].append(ms)
+
+    medians = {name: statistics.median(values) for name, values in imports.items()}
+    print(f"top-level imports, median of {args.runs} runs (ms, cumulative):")
+    for name, ms in sorted(medians.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {name:<32}{ms:8.1f}")
+    print(f"  {'total':<32}{sum(medians.values()):8.1f}")
+
+    print("milestones since app.py start (ms):")
+    for name, values in milestones.items():
+        print(f"  {name:<32}{statistics.median(values):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
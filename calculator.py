@@ -0,0 +1,147 @@
+"""
+Vectorized Holick's rule.
+
+Everything here works on NumPy arrays (or scalars, which broadcast) so a
+whole history can be recomputed in one pass. VitaminDTracker's scalar
+path uses the same holick() so both produce identical readings.
+"""
+import numpy as np
+
+import constants
+from records import body_to_mask
+
+AGE_GROUPS = ("birth", "1-4", "5-9", "10-14", "15", "adult")
+
+# (age group, body part) -> percent of body surface
+BSA_PERCENT = np.array(
+    [
+        [constants.body_surface_area[group][part] for part in constants.body_parts]
+        for group in AGE_GROUPS
+    ]
+)
+
+
+def build_bsa_table():
+    """
+    Exposed surface for every (age group, body mask), in half percents.
+    Lund-Browder values are multiples of 0.5% summing to 100%, so a
+    6 x 32768 uint8 table (192 KiB) holds them exactly.
+    """
+    masks = np.arange(1 << len(constants.body_parts))
+    bits = (masks[:, None] >> np.arange(len(constants.body_parts))) & 1
+    half_percent = np.rint(BSA_PERCENT * 2).astype(np.int64)
+    return (half_percent @ bits.T).astype(np.uint8)
+
+
+BSA_TABLE = build_bsa_table()
+
+
+def age_group_index(age):
+    """
+    Index into AGE_GROUPS: birth, 1-4, 5-9, 10-14, 15, adult.
+    """
+    age = np.asarray(age)
+    return np.select(
+        [age <= 1, age <= 4, age <= 9, age <= 14, age == 15],
+        [0, 1, 2, 3, 4],
+        default=5,
+    )
+
+
+def compute_bsa(body_masks, ages):
+    """
+    Exposed body surface fraction for each (body mask, age) pair.
+    """
+    return BSA_TABLE[age_group_index(ages), body_masks] / 200
+
+
+def med_for(skin_types):
+    return np.vectorize(constants.med.__getitem__, otypes=[np.float64])(
+        np.asarray(skin_types, dtype=str)
+    )
+
+
+def holick(uvi, time_duration, bsa, med):
+    return np.round((21120 * uvi * time_duration * bsa) / (40 * med))
+
+
+def calculate_vitamin_d_batch(durations, body_masks, uvi, skin_types, ages):
+    """
+    IU for many exposures at once.
+
+    durations are seconds, body_masks 15-bit exposure masks and uvi the
+    effective UV index over each exposure (peak times diurnal fraction).
+    skin_types and ages may be scalars or per-entry arrays.
+    """
+    bsa = compute_bsa(body_masks, ages)
+    med = med_for(skin_types)
+    uvi = np.asarray(uvi, dtype=np.float64)
+    durations = np.asarray(durations, dtype=np.float64)
+    return holick(uvi, durations, bsa, med).astype(np.int64)
+
+
+def recompute_entries(items, skin_type, age, legacy_skin_type, legacy_age):
+    """
+    Recompute readings of (day, time, entry) items for new settings.
+
+    Entries record the uvi, skin type and age they were computed from;
+    older entries without them are assumed to use the legacy settings and
+    their uvi is recovered from the stored reading. Only entries whose
+    age group or MED actually changed are returned, updated and tagged
+    with the new settings.
+    """
+    new_group = int(age_group_index(age))
+    new_med = constants.med[skin_type]
+
+    changed = []
+    for day, time, entry in items:
+        old_skin_type = entry.get("skin_type", legacy_skin_type)
+        old_age = entry.get("age", legacy_age)
+        if (
+            int(age_group_index(old_age)) != new_group
+            or constants.med[old_skin_type] != new_med
+        ):
+            changed.append((day, time, entry, old_skin_type, old_age))
+
+    if not changed:
+        return []
+
+    durations = np.array([int(item[2]["duration"]) for item in changed])
+    masks = np.array([body_to_mask(item[2]["body"]) for item in changed])
+    uvi = np.array(
+        [item[2].get("uvi", np.nan) for item in changed], dtype=np.float64
+    )
+
+    # recover uvi for legacy entries by inverting Holick's rule
+    legacy = np.isnan(uvi)
+    if legacy.any():
+        readings = np.array([int(item[2]["reading"]) for item in changed])
+        old_bsa = compute_bsa(masks, [item[4] for item in changed])
+        old_med = med_for([item[3] for item in changed])
+        denominator = 21120 * durations * old_bsa
+        recovered = np.divide(
+            readings * 40 * old_med,
+            denominator,
+            out=np.zeros(len(changed)),
+            where=denominator > 0,
+        )
+        uvi = np.where(legacy, recovered, uvi)
+
+    new_readings = calculate_vitamin_d_batch(durations, masks, uvi, skin_type, age)
+
+    return [
+        (
+            day,
+            time,
+            {
+                **entry,
+                "reading": str(reading),
+                "uvi": float(entry_uvi),
+                "skin_type": skin_type,
+                "age": age,
+            },
+        )
+        for (day, time, entry, _, _), reading, entry_uvi in zip(
+            changed, new_readings.tolist(), uvi.tolist()
+        )
+    ]
@@ -0,0 +1,333 @@
+"""
+Matplotlib charts for the main and sensor views.
+
+Importing this pulls in matplotlib's Qt backend, so ui.py only imports it
+once a view that shows a chart is being built.
+"""
+from datetime import datetime
+
+from PyQt6.QtCore import QTimer, pyqtSignal
+from PyQt6.QtWidgets import QHBoxLayout, QVBoxLayout, QWidget
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+from matplotlib.patches import Polygon, Rectangle
+import numpy as np
+
+import lod
+import solar
+
+
+class Graph(QWidget):
+    """
+    Titled chart whose artists are created once and then updated in place.
+    """
+
+    def __init__(self, title, parent=None):
+        super().__init__(parent)
+
+        self.view = QWidget()
+        self.view.setObjectName("graphWidget")
+
+        self.layout = QHBoxLayout()
+        self.view.setLayout(self.layout)
+
+        self.figure = Figure()
+        self.title = title
+        self.canvas = FigureCanvas(self.figure)
+        self.ax = self.figure.add_subplot(111)
+        self.style_axes()
+
+        self.layout.addWidget(self.canvas)
+        self.canvas.mpl_connect("resize_event", self.on_resize)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.view)
+        self.setLayout(layout)
+
+    def style_axes(self):
+        for spine in self.ax.spines.values():
+            spine.set_visible(False)
+        self.ax.tick_params(axis="both", which="both", length=0)
+        self.ax.tick_params(axis="x", labelrotation=90, labelsize="x-small")
+        self.ax.set_title(self.title)
+
+    def rescale(self):
+        self.ax.relim(visible_only=True)
+        self.ax.autoscale_view()
+        self.canvas.draw_idle()
+
+    def columns(self):
+        # pixel columns of the plot area
+        return max(int(self.ax.bbox.width), 1)
+
+    def on_resize(self, event):
+        pass
+
+
+class UVGraph(Graph):
+    def __init__(self, title, parent=None):
+        super().__init__(title, parent)
+
+        (self.line,) = self.ax.plot(
+            [], [], color="darkorange", linestyle="-", linewidth=2
+        )
+        self.fill = Polygon([[0, 0]], color="#e3e3e3", alpha=0.4)
+        self.fill.sticky_edges.y.append(0)
+        self.ax.add_patch(self.fill)
+        self.ticks = None
+
+    def plot(self, peak, gps_coordinates, date=None):
+        # per-minute curve, shown only for the hours the sun is up
+        if date is None:
+            date = datetime.now().date()
+        curve = solar.day_curve(gps_coordinates, date)
+        daylight = np.flatnonzero(curve > 0.01)
+        if daylight.size:
+            minutes = np.arange(daylight[0], daylight[-1] + 1)
+        else:
+            minutes = np.arange(0)
+        hours = minutes / 60
+        uv_levels = curve[minutes] * float(peak)
+
+        self.line.set_data(hours, uv_levels)
+        if hours.size:
+            self.fill.set_xy(
+                np.column_stack(
+                    [
+                        np.r_[hours[0], hours, hours[-1]],
+                        np.r_[0, uv_levels, 0],
+                    ]
+                )
+            )
+            ticks = tuple(np.arange(np.ceil(hours[0]), hours[-1] + 1))
+        else:
+            self.fill.set_xy([[0, 0]])
+            ticks = ()
+
+        # tick labels only change with the daylight span
+        if ticks != self.ticks:
+            self.ticks = ticks
+            self.ax.set_xticks(ticks, [f"{int(hour)}:00" for hour in ticks])
+
+        self.rescale()
+
+
+class UserLogGraph(Graph):
+    """
+    Bar per reading. When there are more readings than the plot has room
+    for, neighbouring ones share a bar holding their sum, and tick labels
+    are thinned out so they don't overlap.
+    """
+
+    # narrowest bar and the least room per tick label (pixels)
+    min_bar_width = 4
+    min_label_spacing = 20
+
+    def __init__(self, title, parent=None):
+        super().__init__(title, parent)
+
+        self.labels = []
+        self.readings = []
+        self.target = None
+        self.cumulative = True
+        # readings per bar
+        self.group = 1
+        self.heights = np.zeros(0)
+        self.bars = []
+        self.ticks = None
+        (self.cumulative_line,) = self.ax.plot(
+            [], [], color="darkorange", marker="o", linestyle="--", linewidth=2
+        )
+        (self.target_line,) = self.ax.plot([], [], color="black")
+
+    def group_size(self, count):
+        bars = max(self.columns() // self.min_bar_width, 1)
+        return max(-(-count // bars), 1)
+
+    def plot(self, log_labels, log_readings, target=None, cumulative=True):
+        """
+        Show new data, touching only the bars whose value or count changed.
+        """
+        self.labels = list(log_labels)
+        self.readings = list(log_readings)
+        self.target = target
+        self.cumulative = cumulative
+        self.group = self.group_size(len(self.readings))
+        heights = lod.group_sums(self.readings, self.group)
+
+        for bar, height in zip(self.bars, heights):
+            if bar.get_height() != height:
+                bar.set_height(height)
+        for position in range(len(self.bars), len(heights)):
+            self.bars.append(self.add_bar(position, heights[position]))
+        for bar in self.bars[len(heights) :]:
+            bar.remove()
+        del self.bars[len(heights) :]
+
+        self.update_ticks()
+        self.update_lines()
+        self.rescale()
+
+    def append(self, label, reading):
+        """
+        Add one reading at the end, touching only the last bar.
+        """
+        self.labels.append(label)
+        self.readings.append(reading)
+        if self.group_size(len(self.readings)) != self.group:
+            self.plot(self.labels, self.readings, self.target, self.cumulative)
+            return
+
+        if (len(self.readings) - 1) % self.group == 0:
+            self.bars.append(self.add_bar(len(self.bars), reading))
+        else:
+            self.bars[-1].set_height(self.bars[-1].get_height() + reading)
+
+        self.update_ticks()
+        self.update_lines()
+        self.rescale()
+
+    def on_resize(self, event):
+        if self.readings:
+            self.plot(self.labels, self.readings, self.target, self.cumulative)
+
+    def add_bar(self, position, reading):
+        bar = Rectangle((position - 0.4, 0), 0.8, reading, color="#00008B")
+        bar.sticky_edges.y.append(0)
+        self.ax.add_patch(bar)
+        return bar
+
+    def update_ticks(self):
+        labels = self.labels[:: self.group]
+        room = max(self.columns() // self.min_label_spacing, 1)
+        step = max(-(-len(labels) // room), 1)
+        ticks = (tuple(range(0, len(labels), step)), tuple(labels[::step]))
+        if ticks != self.ticks:
+            self.ticks = ticks
+            self.ax.set_xticks(*ticks)
+
+    def update_lines(self):
+        self.heights = lod.group_sums(self.readings, self.group)
+        positions = np.arange(len(self.heights))
+        self.cumulative_line.set_data(positions, np.cumsum(self.heights))
+        self.cumulative_line.set_visible(self.cumulative)
+        self.target_line.set_data(positions, np.full(len(positions), self.target or 0))
+        self.target_line.set_visible(bool(self.target))
+
+    def rescale(self):
+        # limits straight from the heights, relim() walks every bar patch
+        top = max(
+            self.heights.max(initial=0),
+            self.heights.sum() if self.cumulative else 0,
+            self.target or 0,
+        )
+        span = max(len(self.heights), 1)
+        self.ax.set_xlim(-0.4 - 0.05 * span, span - 0.6 + 0.05 * span)
+        self.ax.set_ylim(0, top * 1.05 or 1)
+        self.canvas.draw_idle()
+
+
+class SensorGraph(Graph):
+    """
+    Sensor samples, reduced to the lowest and highest sample per pixel
+    column as they are appended. x is in seconds before the newest sample.
+
+    Scrolling zooms around the pointer and freezes the view; once it
+    settles, fetch(start, end, points) is asked for detail at that zoom
+    (archive.query() in the app). Double-click goes back to live data.
+    """
+
+    resumed = pyqtSignal()
+
+    # wait after the last scroll step before fetching detail (ms)
+    fetch_delay = 150
+
+    def __init__(self, title, fetch=None, parent=None):
+        super().__init__(title, parent)
+
+        self.fetch = fetch
+        self.window = None
+        self.buckets = None
+        self.origin = 0
+        self.zoomed = False
+        (self.line,) = self.ax.plot(
+            [], [], color="darkorange", linestyle="-", linewidth=1
+        )
+
+        self.fetch_timer = QTimer(self)
+        self.fetch_timer.setSingleShot(True)
+        self.fetch_timer.setInterval(self.fetch_delay)
+        self.fetch_timer.timeout.connect(self.fetch_detail)
+
+        self.canvas.mpl_connect("scroll_event", self.on_scroll)
+        self.canvas.mpl_connect("button_press_event", self.on_press)
+
+    def stale(self, window):
+        """
+        True when the columns no longer match `window` seconds across the
+        plot, and the samples have to be appended again after reset().
+        """
+        return self.buckets is None or self.buckets.width != window / self.columns()
+
+    def reset(self, window):
+        self.window = window
+        self.buckets = lod.MinMaxBuckets(window / self.columns())
+
+    def append(self, times, lux):
+        """
+        Add samples (absolute timestamps) and show the last `window` seconds.
+        """
+        if not len(times):
+            return
+        self.buckets.extend(times, lux)
+        self.buckets.trim(times[-1] - self.window)
+
+        # the view stays put while zoomed
+        if self.zoomed:
+            return
+        self.origin = times[-1]
+        x, y = self.buckets.points()
+        self.line.set_data(x - self.origin, y)
+        self.rescale()
+
+    def on_scroll(self, event):
+        if event.xdata is None:
+            return
+        left, right = self.ax.get_xlim()
+        scale = 0.8 if event.button == "up" else 1.25
+        self.zoomed = True
+        self.ax.set_xlim(
+            event.xdata - (event.xdata - left) * scale,
+            event.xdata + (right - event.xdata) * scale,
+        )
+        self.canvas.draw_idle()
+        if self.fetch:
+            self.fetch_timer.start()
+
+    def on_press(self, event):
+        if event.dblclick and self.zoomed:
+            self.zoomed = False
+            self.fetch_timer.stop()
+            self.ax.set_autoscalex_on(True)
+            if self.buckets is not None:
+                x, y = self.buckets.points()
+                self.line.set_data(x - self.origin, y)
+            self.rescale()
+            self.resumed.emit()
+
+    def on_resize(self, event):
+        if self.zoomed and self.fetch:
+            self.fetch_timer.start()
+
+    def fetch_detail(self):
+        if not self.zoomed:
+            return
+        left, right = self.ax.get_xlim()
+        t, low, high, _ = self.fetch(
+            self.origin + left, self.origin + right, self.columns()
+        )
+        x, y = lod.envelope(t, low, high)
+        self.line.set_data(x - self.origin, y)
+        self.ax.relim()
+        self.ax.autoscale_view(scalex=False)
+        self.canvas.draw_idle()
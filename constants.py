@@ -13,6 +13,28 @@ default_coordinates = ("53.343792", "-6.254572")
 
 openmeteo_url = "https://api.open-meteo.com/v1/forecast"
 
+# "json" (entries.json + journal) or "sqlite" (entries.db, seeded from json)
+storage_backend = "json"
+
+# bit order of the body exposure mask, bit 0 = head
+body_parts = (
+    "head",
+    "neck",
+    "left_arm_upper",
+    "left_arm_lower",
+    "left_palm",
+    "right_arm_upper",
+    "right_arm_lower",
+    "right_palm",
+    "torso",
+    "left_leg_upper",
+    "left_leg_lower",
+    "left_feet",
+    "right_leg_upper",
+    "right_leg_lower",
+    "right_feet",
+)
+
 body_surface_area = {
     "birth": {
         "head": 19,
@@ -128,3 +150,17 @@ med = {
 }
 
 dynamodb_table = "dsure"
+# entries are synced with the table when enabled (see sync.py); the user
+# defaults to this install's device id, endpoint can point at DynamoDB Local
+dynamodb_sync = False
+dynamodb_user = None
+dynamodb_endpoint = None
+dynamodb_region = None
+
+# lux sensor: "bh1750" (I2C), "serial" or "replay" (see sensor.make_source)
+sensor_source = "bh1750"
+sensor_options = {"bus": 1, "address": 0x23}
+sensor_archive_path = "sensor_archive"
+
+# rough outdoor calibration for live sessions: UV index 10 at ~100k lux
+lux_per_uvi = 10000
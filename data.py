@@ -1,35 +1,46 @@
 import constants
 import json
 import os
+from bisect import bisect_left
 from datetime import datetime
-import requests
-import openmeteo_requests
-import requests_cache
-import pandas as pd
-from retry_requests import retry
+import calculator
+import forecast
+import geocode
+import solar
 from random import random, randint
+from storage import make_store
+from aggregates import Aggregates
+from records import body_to_mask
 
 
 class VitaminDTracker:
-    def __init__(self):
+    def __init__(self, store=None):
+        self.store = store if store else make_store(constants.storage_backend)
+        # called with [(day, time), ...] after entries are saved
+        self.watchers = []
         self.load()
 
     def load(self):
-        if os.path.exists("entries.json"):
-            with open("entries.json") as file:
-                self.entries = json.loads(file.read())
-        else:
-            self.entries = {}
+        self.store.load()
 
         self.today = datetime.now().strftime("%d-%m-%Y")
-        if self.today not in self.entries:
-            self.entries[self.today] = {}
+        self.store.add_day(self.today)
+
+        self.day_index = DayIndex(self.store.days())
+        self.aggregates = Aggregates()
+        self.aggregates.rebuild(self.store.readings())
 
     def backup(self):
-        with open("entries.json", "w") as file:
-            file.write(json.dumps(self.entries, indent=4))
+        self.store.flush()
 
     def process_entry(self, log_entry, user_data):
+        self.add_entry(*self.prepare_entry(log_entry, user_data))
+
+    def prepare_entry(self, log_entry, user_data):
+        """
+        Compute the stored form of a log entry without saving it.
+        Returns (day, start_time, entry) for add_entry().
+        """
         print("Processing entry:", log_entry)
 
         start_time = datetime.strptime(log_entry["start_time"], "%H:%M").time()
@@ -43,6 +54,9 @@ class VitaminDTracker:
         duration = abs(end_time_secs - start_time_secs)
         print(duration)
 
+        uvi = self.effective_uvi(
+            log_entry["location"][1], log_entry["start_time"], duration
+        )
         vitamin_d = self.calculate_vitamin_d(
             log_entry["location"][1],
             log_entry["start_time"],
@@ -50,60 +64,91 @@ class VitaminDTracker:
             log_entry["body"],
             user_data.data["skin_type"],
             user_data.data["age"],
+            uvi=uvi,
         )
 
-        self.entries[self.today][log_entry["start_time"]] = {
-            "duration": str(duration),
-            "reading": str(vitamin_d),
-            "location": log_entry["location"][0],
-            "body": log_entry["body"],
-        }
-
-        self.backup()
+        return (
+            self.today,
+            log_entry["start_time"],
+            {
+                "duration": str(duration),
+                "reading": str(vitamin_d),
+                "location": log_entry["location"][0],
+                "body": log_entry["body"],
+                "uvi": uvi,
+                "skin_type": user_data.data["skin_type"],
+                "age": user_data.data["age"],
+            },
+        )
 
     def get_last_7(self):
-        return self.sorted_days()[-7:]
+        return self.day_index.last(7)
 
     def daily_total(self, day):
-        total = 0
-        for timestamp in self.entries[day]:
-            total += int(self.entries[day][timestamp]["reading"])
+        return self.aggregates.daily_total(day)
+
+    def weekly_total(self, day):
+        return self.aggregates.weekly_total(day)
+
+    def monthly_total(self, day):
+        return self.aggregates.monthly_total(day)
 
-        return total
+    def daily_totals(self, first_day, last_day):
+        return self.store.daily_totals(first_day, last_day)
+
+    def range_total(self, first_day, last_day):
+        return self.store.range_total(first_day, last_day)
+
+    def stored_reading(self, day, time):
+        try:
+            return int(self.store.get_entry(day, time)["reading"])
+        except KeyError:
+            return 0
 
     def add_entry(self, day, time, entry):
-        if day not in self.entries:
-            self.entries[day] = {}
+        previous_reading = self.stored_reading(day, time)
+
+        self.store.add_entry(day, time, entry)
+        self.day_index.add(day)
+        self.aggregates.add(day, int(entry["reading"]), previous_reading)
+        self.notify([(day, time)])
+
+    def add_entries(self, items):
+        """
+        Save many (day, time, entry) items in one store write.
+        """
+        previous_readings = [self.stored_reading(day, time) for day, time, _ in items]
 
-        self.entries[day][time] = entry
+        self.store.add_entries(items)
+        for (day, _, entry), previous_reading in zip(items, previous_readings):
+            self.day_index.add(day)
+            self.aggregates.add(day, int(entry["reading"]), previous_reading)
+        self.notify([(day, time) for day, time, _ in items])
+
+    def notify(self, keys):
+        for watcher in self.watchers:
+            watcher(keys)
+
+    def get_entry(self, day, time):
+        return self.store.get_entry(day, time)
+
+    def day_entries(self, day):
+        return self.store.day_entries(day)
 
     def sorted_days(self):
-        return sorted(
-            self.entries.keys(),
-            key=lambda time_str: datetime.strptime(time_str, "%d-%m-%Y").time(),
-        )
+        return list(self.day_index.days)
+
+    def previous_day(self, day):
+        return self.day_index.previous(day)
+
+    def next_day(self, day):
+        return self.day_index.next(day)
 
     def sorted_times(self, day):
-        return sorted(
-            self.entries[day].keys(),
-            key=lambda time_str: datetime.strptime(time_str, "%H:%M").time(),
-        )
+        return self.store.sorted_times(day)
 
     def convert_text_to_gps(self, text_address):
-        base_url = "https://api.opencagedata.com/geocode/v1/json"
-        params = {
-            "q": text_address,
-            "key": constants.ocd_key,
-        }
-        response = requests.get(base_url, params=params)
-        data = response.json()
-
-        if data["total_results"] > 0:
-            location = data["results"][0]["geometry"]
-            return location["lat"], location["lng"]
-        else:
-            print(f"Failed to find '{text_address}'!")
-            return None
+        return geocode.get_geocoder().lookup(text_address)
 
     def get_uvi_from_openmeteo(self, gps_coordinates):
         """
@@ -111,49 +156,47 @@ class VitaminDTracker:
         Returns UV-I max and UV-I max (clear sky) for next 7 days.
 
         """
-        cache_session = requests_cache.CachedSession(".cache", expire_after=3600)
-        retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
-        openmeteo = openmeteo_requests.Client(session=retry_session)
-        params = {
-            "latitude": gps_coordinates[0],
-            "longitude": gps_coordinates[1],
-            "daily": ["uv_index_max", "uv_index_clear_sky_max"],
-            "timezone": "GMT",
-        }
-        responses = openmeteo.weather_api(constants.openmeteo_url, params=params)
-        response = responses[0]
-        daily = response.Daily()
-        daily_uv_index_max = daily.Variables(0).ValuesAsNumpy()
-        daily_uv_index_clear_sky_max = daily.Variables(1).ValuesAsNumpy()
-
-        return daily_uv_index_max, daily_uv_index_clear_sky_max
+        return forecast.get_client().uvi(gps_coordinates)
+
+    def get_saved_uvi(self, gps_coordinates):
+        """
+        Last fetched forecast for the location, without network access.
+        Returns (value, fresh) where value is shaped like
+        get_uvi_from_openmeteo's, or (None, False).
+        """
+        return forecast.get_client().saved(gps_coordinates)
 
     def compute_bsa(self, body, age):
         """
         Compute Body Surface area based on age and markers.
+        body is a body mask or the schema's dict of markers.
         """
-        if age <= 1:
-            age_group = "birth"
-        elif 1 < age <= 4:
-            age_group = "1-4"
-        elif 4 < age <= 9:
-            age_group = "5-9"
-        elif 9 < age <= 14:
-            age_group = "10-14"
-        elif age == 15:
-            age_group = "15"
-        else:
-            age_group = "adult"
+        return float(calculator.compute_bsa(body_to_mask(body), age))
 
-        total_surface = 0
-        for pos, value in body.items():
-            if value:
-                total_surface += constants.body_surface_area[age_group][pos]
-
-        return total_surface / 100
+    def effective_uvi(self, gps_coordinates, start_time, time_duration):
+        """
+        Today's clear-sky max UVI averaged over the session with the
+        solar-geometry curve.
+        """
+        uvi = float(self.get_uvi_from_openmeteo(gps_coordinates)[1][0])
+
+        start = datetime.strptime(start_time, "%H:%M")
+        return uvi * solar.interval_fraction(
+            gps_coordinates,
+            datetime.now().date(),
+            start.hour * 3600 + start.minute * 60,
+            time_duration,
+        )
 
     def calculate_vitamin_d(
-        self, gps_coordinates, start_time, time_duration, body, skin_type, age
+        self,
+        gps_coordinates,
+        start_time,
+        time_duration,
+        body,
+        skin_type,
+        age,
+        uvi=None,
     ):
         # calculate body surface area (bsa)
         bsa = self.compute_bsa(body, age)
@@ -161,36 +204,69 @@ class VitaminDTracker:
         # calculate minimal erythema dosage (med)
         med = constants.med[skin_type]
 
-        # get today's maximum clearsky reading
-        uvi = self.get_uvi_from_openmeteo(gps_coordinates)[1][0]
-
-        # TODO: add deterioration based on time of day
-        hour = int(start_time.split(":")[0])
-        fractions = {
-            8: 0.2,
-            9: 0.5,
-            10: 0.7,
-            11: 0.9,
-            12: 1,
-            13: 0.9,
-            14: 0.7,
-            15: 0.5,
-            16: 0.2,
-        }
-
-        if hour not in fractions:
-            uvi = 0
-        else:
-            uvi *= fractions[hour]
+        # get today's UVI over the session unless the caller already has it
+        if uvi is None:
+            uvi = self.effective_uvi(gps_coordinates, start_time, time_duration)
 
         # calculate vitamin d
         print(
             f"calculating vitamin D: uvi={uvi}, time_duration={time_duration}, bsa={bsa}, med={med}"
         )
-        vitamin_d = round((21120 * uvi * time_duration * bsa) / (40 * med))
+        vitamin_d = int(calculator.holick(uvi, time_duration, bsa, med))
         print(f"VitaminD={vitamin_d}")
         return vitamin_d
 
+
+class DayIndex:
+    """
+    Day keys kept in calendar order, with their ordinals alongside for
+    bisect lookups.
+    """
+
+    def __init__(self, days=()):
+        pairs = sorted((day_ordinal(day), day) for day in days)
+        self.ordinals = [ordinal for ordinal, _ in pairs]
+        self.days = [day for _, day in pairs]
+
+    def __len__(self):
+        return len(self.days)
+
+    def __contains__(self, day):
+        return self.find(day) is not None
+
+    def find(self, day):
+        ordinal = day_ordinal(day)
+        index = bisect_left(self.ordinals, ordinal)
+        if index < len(self.ordinals) and self.ordinals[index] == ordinal:
+            return index
+        return None
+
+    def add(self, day):
+        ordinal = day_ordinal(day)
+        index = bisect_left(self.ordinals, ordinal)
+        if index == len(self.ordinals) or self.ordinals[index] != ordinal:
+            self.ordinals.insert(index, ordinal)
+            self.days.insert(index, day)
+
+    def previous(self, day):
+        index = bisect_left(self.ordinals, day_ordinal(day))
+        return self.days[index - 1] if index > 0 else None
+
+    def next(self, day):
+        ordinal = day_ordinal(day)
+        index = bisect_left(self.ordinals, ordinal)
+        if index < len(self.ordinals) and self.ordinals[index] == ordinal:
+            index += 1
+        return self.days[index] if index < len(self.days) else None
+
+    def last(self, count):
+        return self.days[-count:]
+
+
+def day_ordinal(day):
+    return datetime.strptime(day, "%d-%m-%Y").toordinal()
+
+
 class UserData:
     def __init__(self):
         self.load_user_data()
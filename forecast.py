@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+import constants
+from storage import write_atomic
+
+
+class ForecastClient:
+    """
+    Long-lived Open-Meteo client.
+
+    One cached/retrying session is shared by every lookup, and an in-memory
+    LRU keyed by rounded coordinates and forecast date sits in front of the
+    requests_cache SQLite file. The last fetched forecast is also written to
+    saved_path so the UI can show it straight away on the next start;
+    headless clients pass saved_path=None and keep nothing on disk.
+    """
+
+    def __init__(
+        self,
+        cache_path=".cache",
+        expire_after=3600,
+        max_entries=128,
+        saved_path="forecast.json",
+    ):
+        self.cache_path = cache_path
+        self.saved_path = saved_path
+        self.expire_after = expire_after
+        self.max_entries = max_entries
+        self.client = None
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+
+    def connect(self):
+        with self.lock:
+            if self.client is None:
+                # the HTTP stack is slow to import, load it on first use
+                import openmeteo_requests
+                import requests_cache
+                from retry_requests import retry
+
+                cache_session = requests_cache.CachedSession(
+                    self.cache_path, expire_after=self.expire_after
+                )
+                retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
+                self.client = openmeteo_requests.Client(session=retry_session)
+        return self.client
+
+    @staticmethod
+    def key(gps_coordinates):
+        return (
+            round(float(gps_coordinates[0]), 2),
+            round(float(gps_coordinates[1]), 2),
+            datetime.now(timezone.utc).date(),
+        )
+
+    def cached(self, key):
+        with self.lock:
+            item = self.memory.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self.memory[key]
+                return None
+            self.memory.move_to_end(key)
+            return item[1]
+
+    def store(self, key, value):
+        with self.lock:
+            self.memory[key] = (time.monotonic() + self.expire_after, value)
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_entries:
+                self.memory.popitem(last=False)
+
+    def uvi(self, gps_coordinates):
+        """
+        Returns UV-I max and UV-I max (clear sky) for next 7 days.
+        """
+        key = self.key(gps_coordinates)
+        value = self.cached(key)
+        if value is not None:
+            return value
+
+        params = {
+            "latitude": gps_coordinates[0],
+            "longitude": gps_coordinates[1],
+            "daily": ["uv_index_max", "uv_index_clear_sky_max"],
+            "timezone": "GMT",
+        }
+        responses = self.connect().weather_api(constants.openmeteo_url, params=params)
+        daily = responses[0].Daily()
+        value = (
+            daily.Variables(0).ValuesAsNumpy(),
+            daily.Variables(1).ValuesAsNumpy(),
+        )
+
+        self.store(key, value)
+        if self.saved_path:
+            try:
+                self.save(key, value)
+            except Exception as error:
+                # the lookup itself worked
+                print(f"Could not save the forecast: {error}")
+        return value
+
+    def save(self, key, value):
+        text = json.dumps(
+            {
+                "latitude": key[0],
+                "longitude": key[1],
+                "date": key[2].isoformat(),
+                "fetched_at": time.time(),
+                "uvi_max": value[0].tolist(),
+                "uvi_clear_sky_max": value[1].tolist(),
+            },
+            indent=4,
+        )
+        # one writer at a time; lock keeps guarding only the memory cache
+        # so cached lookups never wait on the disk
+        with self.save_lock:
+            write_atomic(self.saved_path, text)
+
+    def saved(self, gps_coordinates):
+        """
+        Last known forecast for the location without touching the network.
+        Returns (value, fresh), value starting at today, or (None, False).
+        """
+        key = self.key(gps_coordinates)
+        value = self.cached(key)
+        if value is not None:
+            return value, True
+
+        if not self.saved_path or not os.path.exists(self.saved_path):
+            return None, False
+        with open(self.saved_path) as file:
+            record = json.loads(file.read())
+        if (record["latitude"], record["longitude"]) != key[:2]:
+            return None, False
+
+        # drop the days that have already passed
+        offset = (key[2] - date.fromisoformat(record["date"])).days
+        if offset < 0 or offset >= len(record["uvi_max"]):
+            return None, False
+        value = (
+            np.array(record["uvi_max"][offset:], dtype=np.float32),
+            np.array(record["uvi_clear_sky_max"][offset:], dtype=np.float32),
+        )
+
+        fresh = offset == 0 and time.time() - record["fetched_at"] < self.expire_after
+        if fresh:
+            self.store(key, value)
+        return value, fresh
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ForecastClient()
+    return _client
+
+
+def set_client(client):
+    """
+    Replace the shared client, e.g. with one that has no saved_path for
+    tools that shouldn't touch the desktop app's forecast.json.
+    """
+    global _client
+    with _client_lock:
+        _client = client
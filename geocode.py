@@ -0,0 +1,193 @@
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+import constants
+
+
+def normalize_address(text_address):
+    """
+    "  Trinity College, Dublin. " -> "trinity college dublin"
+    """
+    text = unicodedata.normalize("NFKC", text_address).casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+class GeocodeError(RuntimeError):
+    """
+    A lookup failed (HTTP error, quota, rate limit) rather than finding
+    nothing. found holds what lookup_many() did resolve.
+    """
+
+    def __init__(self, message, found=None):
+        super().__init__(message)
+        self.found = found if found is not None else {}
+
+
+class Geocoder:
+    """
+    OpenCage lookups behind a persistent SQLite cache with LRU eviction.
+
+    Keys are normalized addresses, so "Dublin" and " dublin. " share a
+    row. Addresses OpenCage has no result for are cached for miss_ttl
+    seconds so they don't burn quota again; failed requests aren't cached.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS geocode (
+            address TEXT PRIMARY KEY,
+            lat REAL,
+            lng REAL,
+            last_used REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS geocode_last_used ON geocode (last_used);
+    """
+
+    def __init__(
+        self, path="geocode.db", max_entries=1000, max_workers=4, miss_ttl=7 * 86400
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_workers = max_workers
+        self.miss_ttl = miss_ttl
+        self.db = None
+        # imported here so startup doesn't pay for the HTTP stack
+        import requests
+
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+
+    def connect(self):
+        if self.db is None:
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.executescript(self.schema)
+        return self.db
+
+    def lookup(self, text_address):
+        return self.lookup_many([text_address])[text_address]
+
+    def lookup_many(self, text_addresses):
+        """
+        Resolve many addresses at once. Returns {address: (lat, lng) or None}.
+        Every distinct normalized address hits the API at most once. Raises
+        GeocodeError, after caching the rest, if any request failed.
+        """
+        keys = {address: normalize_address(address) for address in text_addresses}
+        found = self.cached(set(keys.values()))
+
+        def fetch(key):
+            try:
+                return self.fetch(key), None
+            except Exception as error:
+                return None, error
+
+        errors = []
+        missing = [key for key in set(keys.values()) if key not in found]
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = dict(zip(missing, executor.map(fetch, missing)))
+            resolved = {
+                key: value for key, (value, error) in results.items() if error is None
+            }
+            errors = [error for _, error in results.values() if error is not None]
+            self.save(resolved)
+            found.update(resolved)
+
+        for address, key in keys.items():
+            if key in found and found[key] is None:
+                print(f"Failed to find '{address}'!")
+
+        result = {address: found[key] for address, key in keys.items() if key in found}
+        if errors:
+            raise GeocodeError(
+                f"Geocoding failed for {len(errors)} address(es): {errors[0]}", result
+            )
+        return result
+
+    def cached(self, keys):
+        if not keys:
+            return {}
+
+        keys = list(keys)
+        found = {}
+        with self.lock:
+            db = self.connect()
+            # stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = db.execute(
+                    f"SELECT address, lat, lng, last_used FROM geocode WHERE address IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                now = time.time()
+                for address, lat, lng, last_used in rows:
+                    if lat is not None:
+                        found[address] = (lat, lng)
+                    elif now - last_used < self.miss_ttl:
+                        found[address] = None
+
+                # misses keep the time they were looked up, for miss_ttl
+                with db:
+                    db.execute(
+                        f"UPDATE geocode SET last_used = ? WHERE address IN ({placeholders})"
+                        " AND lat IS NOT NULL",
+                        [now, *chunk],
+                    )
+        return found
+
+    def fetch(self, key):
+        base_url = "https://api.opencagedata.com/geocode/v1/json"
+        params = {
+            "q": key,
+            "key": constants.ocd_key,
+        }
+        response = self.session.get(base_url, params=params)
+        # quota and rate-limit errors (402, 403, 429) come back without
+        # results too; only a successful answer means "no such address"
+        if response.status_code != 200:
+            raise GeocodeError(f"OpenCage returned HTTP {response.status_code}")
+        data = response.json()
+        status = data.get("status", {})
+        if status.get("code", 200) != 200:
+            raise GeocodeError(
+                f"OpenCage returned {status.get('code')}: {status.get('message')}"
+            )
+
+        if data["total_results"] > 0:
+            location = data["results"][0]["geometry"]
+            return location["lat"], location["lng"]
+        return None
+
+    def save(self, resolved):
+        now = time.time()
+        rows = [
+            (key, *(coordinates if coordinates else (None, None)), now)
+            for key, coordinates in resolved.items()
+        ]
+        with self.lock:
+            db = self.connect()
+            with db:
+                db.executemany("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?)", rows)
+                db.execute(
+                    "DELETE FROM geocode WHERE address IN ("
+                    " SELECT address FROM geocode ORDER BY last_used DESC"
+                    " LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder():
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is None:
+            _geocoder = Geocoder()
+    return _geocoder
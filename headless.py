@@ -0,0 +1,113 @@
+"""
+Input parsing and setup shared by the tools that run without the UI,
+server.py and batch.py. Parsers raise ValueError for values they don't
+accept.
+"""
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import constants
+import forecast
+import records
+
+
+def use_headless_forecast():
+    # the desktop app's last known forecast isn't ours to overwrite
+    forecast.set_client(forecast.ForecastClient(saved_path=None))
+
+
+def seconds_of_day(text):
+    # "HH:MM", parsed by hand since strptime is slow enough to show up here
+    text = str(text)
+    hours, minutes = text.split(":")
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= hours < 24 and 0 <= minutes < 60 and len(text) == 5):
+        raise ValueError(f"bad time {text!r}")
+    return hours * 3600 + minutes * 60
+
+
+def body_mask(value):
+    """
+    Body exposure mask from a mask, a {part: exposed} dict or part names
+    joined by "|".
+    """
+    if isinstance(value, dict):
+        unknown = set(value) - set(constants.body_parts)
+        if unknown:
+            raise ValueError(f"unknown body part {sorted(unknown)[0]!r}")
+        return records.body_to_mask(value)
+    if isinstance(value, str) and not value.strip().isdigit():
+        mask = 0
+        for part in filter(None, map(str.strip, value.split("|"))):
+            if part not in constants.body_parts:
+                raise ValueError(f"unknown body part {part!r}")
+            mask |= 1 << constants.body_parts.index(part)
+        return mask
+
+    if isinstance(value, str):
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"bad body {value!r}")
+    if not 0 <= value < 1 << len(constants.body_parts):
+        raise ValueError(f"bad body mask {value}")
+    return value
+
+
+def skin_type(text):
+    text = str(text).strip()
+    if text not in constants.med:
+        raise ValueError(f"bad skin type {text!r}")
+    return int(text)
+
+
+def age(text):
+    value = int(text)
+    if value < 0:
+        raise ValueError(f"bad age {text!r}")
+    return value
+
+
+def zone(name=None, minutes=None):
+    """
+    What utc_offset() takes from a timezone name or a number of minutes
+    ahead of UTC, the name first; None when neither is given.
+    """
+    if name:
+        try:
+            ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"unknown timezone {name!r}")
+        return name
+    if minutes is not None and minutes != "":
+        minutes = int(minutes)
+        if not -14 * 60 <= minutes <= 14 * 60:
+            raise ValueError(f"bad utc_offset {minutes}")
+        return minutes
+    return None
+
+
+def utc_offset(gps, day, zone=None):
+    """
+    Minutes ahead of UTC at noon on the day: the zone's, or without one
+    the nominal zone of the longitude.
+    """
+    if isinstance(zone, str):
+        noon = datetime.combine(day, time(12), ZoneInfo(zone))
+        return int(noon.utcoffset().total_seconds() // 60)
+    if zone is not None:
+        return zone
+    return round(float(gps[1]) / 15) * 60
+
+
+def local_time(item, gps):
+    """
+    The client's (date, minutes ahead of UTC) now, from the item's
+    "timezone" or "utc_offset", or else the longitude's nominal zone.
+    """
+    now = datetime.now(timezone.utc)
+    item_zone = zone(item.get("timezone"), item.get("utc_offset"))
+    if isinstance(item_zone, str):
+        now = now.astimezone(ZoneInfo(item_zone))
+        return now.date(), int(now.utcoffset().total_seconds() // 60)
+    minutes = utc_offset(gps, None, item_zone)
+    return (now + timedelta(minutes=minutes)).date(), minutes
@@ -0,0 +1,113 @@
+"""
+Level-of-detail reduction for the charts.
+
+A line never needs more than two points per pixel column: the lowest and
+the highest sample that falls in it. MinMaxBuckets keeps those for
+fixed-width columns and is updated as samples arrive, touching only the
+newest column. envelope() gives archive query results the same shape and
+group_sums() merges bars that would be narrower than a few pixels.
+"""
+import numpy as np
+
+
+def first_true(mask, starts):
+    # index of the first True at or after each start
+    indexes = np.flatnonzero(mask)
+    return indexes[np.searchsorted(indexes, starts)]
+
+
+class MinMaxBuckets:
+    """
+    Lowest and highest (x, y) per column of `width` x units. x must not
+    decrease from one extend() to the next.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.low_x = np.zeros(0)
+        self.low_y = np.zeros(0)
+        self.high_x = np.zeros(0)
+        self.high_y = np.zeros(0)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def extend(self, x, y):
+        if not len(x):
+            return
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+
+        keys = np.floor(x / self.width).astype(np.int64)
+        starts = np.r_[0, np.flatnonzero(np.diff(keys)) + 1]
+        counts = np.diff(np.r_[starts, len(x)])
+        low_y = np.minimum.reduceat(y, starts)
+        high_y = np.maximum.reduceat(y, starts)
+        low_x = x[first_true(y == np.repeat(low_y, counts), starts)]
+        high_x = x[first_true(y == np.repeat(high_y, counts), starts)]
+        keys = keys[starts]
+
+        # the newest column may still be filling up
+        if len(self.keys) and self.keys[-1] == keys[0]:
+            if low_y[0] < self.low_y[-1]:
+                self.low_x[-1], self.low_y[-1] = low_x[0], low_y[0]
+            if high_y[0] > self.high_y[-1]:
+                self.high_x[-1], self.high_y[-1] = high_x[0], high_y[0]
+            keys, low_x, low_y, high_x, high_y = (
+                keys[1:],
+                low_x[1:],
+                low_y[1:],
+                high_x[1:],
+                high_y[1:],
+            )
+
+        self.keys = np.concatenate([self.keys, keys])
+        self.low_x = np.concatenate([self.low_x, low_x])
+        self.low_y = np.concatenate([self.low_y, low_y])
+        self.high_x = np.concatenate([self.high_x, high_x])
+        self.high_y = np.concatenate([self.high_y, high_y])
+
+    def trim(self, start):
+        """
+        Drop the columns that end before start.
+        """
+        cut = np.searchsorted((self.keys + 1) * self.width, start, side="right")
+        self.keys = self.keys[cut:]
+        self.low_x = self.low_x[cut:]
+        self.low_y = self.low_y[cut:]
+        self.high_x = self.high_x[cut:]
+        self.high_y = self.high_y[cut:]
+
+    def points(self):
+        """
+        Two points per column, in x order.
+        """
+        low_first = self.low_x <= self.high_x
+        x = np.empty(2 * len(self.keys))
+        y = np.empty(2 * len(self.keys))
+        x[0::2] = np.where(low_first, self.low_x, self.high_x)
+        y[0::2] = np.where(low_first, self.low_y, self.high_y)
+        x[1::2] = np.where(low_first, self.high_x, self.low_x)
+        y[1::2] = np.where(low_first, self.high_y, self.low_y)
+        return x, y
+
+
+def envelope(t, low, high):
+    """
+    A line through the low and high of each bucket. Raw samples (low ==
+    high) are returned as they are.
+    """
+    if np.array_equal(low, high):
+        return t, low
+    return np.repeat(t, 2), np.column_stack([low, high]).ravel()
+
+
+def group_sums(values, size):
+    """
+    Sums of consecutive runs of `size` values (the last run may be shorter).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if size == 1 or not len(values):
+        return values
+    return np.add.reduceat(values, np.arange(0, len(values), size))
@@ -0,0 +1,85 @@
+import constants
+
+
+def body_to_mask(body):
+    if isinstance(body, int):
+        return body
+
+    mask = 0
+    for bit, part in enumerate(constants.body_parts):
+        if body.get(part):
+            mask |= 1 << bit
+    return mask
+
+
+def mask_to_body(mask):
+    return {part: bool(mask >> bit & 1) for bit, part in enumerate(constants.body_parts)}
+
+
+class LocationTable:
+    """
+    Interns location names so every entry holds a small integer id.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+
+    def intern(self, name):
+        location_id = self.ids.get(name)
+        if location_id is None:
+            location_id = len(self.names)
+            self.names.append(name)
+            self.ids[name] = location_id
+        return location_id
+
+    def name(self, location_id):
+        return self.names[location_id]
+
+
+class Entry:
+    """
+    Compact in-memory log entry: duration in seconds, reading in IU, an
+    interned location id and the body exposure bitmask.
+
+    uvi, skin_type and age are the inputs the reading was computed from.
+    Entries logged before they were recorded leave them as None.
+    """
+
+    __slots__ = ("duration", "reading", "location", "body", "uvi", "skin_type", "age")
+
+    def __init__(
+        self, duration, reading, location, body, uvi=None, skin_type=None, age=None
+    ):
+        self.duration = duration
+        self.reading = reading
+        self.location = location
+        self.body = body
+        self.uvi = uvi
+        self.skin_type = skin_type
+        self.age = age
+
+    @classmethod
+    def from_json(cls, entry, locations):
+        return cls(
+            int(entry["duration"]),
+            int(entry["reading"]),
+            locations.intern(entry["location"]),
+            body_to_mask(entry["body"]),
+            entry.get("uvi"),
+            entry.get("skin_type"),
+            entry.get("age"),
+        )
+
+    def to_json(self, locations):
+        entry = {
+            "duration": str(self.duration),
+            "reading": str(self.reading),
+            "location": locations.name(self.location),
+            "body": mask_to_body(self.body),
+        }
+        for field in ("uvi", "skin_type", "age"):
+            value = getattr(self, field)
+            if value is not None:
+                entry[field] = value
+        return entry
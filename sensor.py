@@ -0,0 +1,243 @@
+"""
+Lux sensor ingestion.
+
+A source produces (timestamp, lux) samples from read(), which returns None
+when nothing arrived in time and raises EOFError when the stream ends.
+SensorReader pulls them on its own thread into a fixed-size RingBuffer and
+tells the GUI about new data at most every emit_interval seconds. Views
+read the buffer themselves, so the signal rate doesn't depend on the
+sample rate.
+"""
+import threading
+import time
+
+import numpy as np
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class BH1750Source:
+    """
+    BH1750 ambient light sensor on an I2C bus (needs smbus2).
+    """
+
+    # continuous measurement modes: (opcode, seconds per measurement)
+    modes = {"high": (0x10, 0.12), "low": (0x13, 0.016)}
+
+    def __init__(self, bus=1, address=0x23, mode="high"):
+        self.bus_number = bus
+        self.address = address
+        self.opcode, self.interval = self.modes[mode]
+        self.bus = None
+        self.next_read = 0
+
+    def open(self):
+        from smbus2 import SMBus
+
+        self.bus = SMBus(self.bus_number)
+        self.bus.write_byte(self.address, self.opcode)
+        self.next_read = time.monotonic() + self.interval
+
+    def read(self):
+        delay = self.next_read - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_read = max(self.next_read + self.interval, time.monotonic())
+
+        high, low = self.bus.read_i2c_block_data(self.address, self.opcode, 2)
+        return time.time(), ((high << 8) | low) / 1.2
+
+    def close(self):
+        if self.bus is not None:
+            self.bus.close()
+            self.bus = None
+
+
+class SerialSource:
+    """
+    Microcontroller streaming one "lux" or "timestamp,lux" line per sample
+    over a serial port (needs pyserial).
+    """
+
+    def __init__(self, port="/dev/ttyUSB0", baudrate=115200):
+        self.port = port
+        self.baudrate = baudrate
+        self.serial = None
+
+    def open(self):
+        import serial
+
+        self.serial = serial.Serial(self.port, self.baudrate, timeout=1)
+
+    def read(self):
+        fields = self.serial.readline().decode("ascii", "ignore").strip().split(",")
+        try:
+            if len(fields) == 2:
+                return float(fields[0]), float(fields[1])
+            return time.time(), float(fields[0])
+        except ValueError:
+            # timeout or a partial line
+            return None
+
+    def close(self):
+        if self.serial is not None:
+            self.serial.close()
+            self.serial = None
+
+
+class ReplaySource:
+    """
+    Replays a recorded "timestamp,lux" CSV in real time (scaled by speed),
+    or at a fixed rate in Hz. Samples are restamped with the current time.
+    """
+
+    def __init__(self, path="lux_replay.csv", speed=1.0, rate=None, loop=True):
+        self.path = path
+        self.speed = speed
+        self.rate = rate
+        self.loop = loop
+        self.times = None
+        self.lux = None
+        self.position = 0
+        self.started = 0
+        self.offset = 0
+
+    def open(self):
+        data = np.loadtxt(self.path, delimiter=",", ndmin=2, dtype=np.float64)
+        self.times = data[:, 0]
+        self.lux = data[:, 1].astype(np.float32)
+        self.position = 0
+        self.started = time.monotonic()
+        self.offset = self.times[0]
+
+    def read(self):
+        if self.position == len(self.lux):
+            if not self.loop:
+                raise EOFError(self.path)
+            self.position = 0
+            self.started = time.monotonic()
+
+        if self.rate:
+            due = self.started + self.position / self.rate
+        else:
+            due = self.started + (self.times[self.position] - self.offset) / self.speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        lux = float(self.lux[self.position])
+        self.position += 1
+        return time.time(), lux
+
+    def close(self):
+        self.times = self.lux = None
+
+
+def make_source(kind, **options):
+    if kind == "serial":
+        return SerialSource(**options)
+    if kind == "replay":
+        return ReplaySource(**options)
+
+    return BH1750Source(**options)
+
+
+class RingBuffer:
+    """
+    Last `capacity` samples in preallocated arrays. `written` counts every
+    sample ever appended and works as a cursor for since().
+    """
+
+    def __init__(self, capacity=1 << 16):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.lux = np.zeros(capacity, dtype=np.float32)
+        self.written = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    def append(self, timestamp, lux):
+        with self.lock:
+            index = self.written % self.capacity
+            self.times[index] = timestamp
+            self.lux[index] = lux
+            self.written += 1
+
+    def since(self, cursor):
+        """
+        Samples appended after `cursor` (oldest first, at most capacity of
+        them) and the new cursor.
+        """
+        with self.lock:
+            first = max(cursor, self.written - self.capacity)
+            indexes = np.arange(first, self.written) % self.capacity
+            return self.times[indexes], self.lux[indexes], self.written
+
+    def latest(self, count):
+        with self.lock:
+            written = self.written
+        return self.since(max(0, written - count))[:2]
+
+
+class SensorReader(QObject):
+    """
+    Runs a source on a daemon thread and fills the ring buffer.
+    """
+
+    updated = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, source, capacity=1 << 16, emit_interval=0.05):
+        super().__init__()
+        self.source = source
+        self.buffer = RingBuffer(capacity)
+        self.emit_interval = emit_interval
+        # called with (timestamp, lux) for every sample, on the sensor thread
+        self.consumers = ()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def add_consumer(self, consumer):
+        self.consumers = self.consumers + (consumer,)
+
+    def remove_consumer(self, consumer):
+        self.consumers = tuple(item for item in self.consumers if item != consumer)
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="sensor", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def run(self):
+        try:
+            self.source.open()
+            last_emit = 0
+            while not self.stopping.is_set():
+                try:
+                    sample = self.source.read()
+                except EOFError:
+                    break
+                if sample is None:
+                    continue
+                self.buffer.append(*sample)
+                for consumer in self.consumers:
+                    consumer(*sample)
+
+                now = time.monotonic()
+                if now - last_emit >= self.emit_interval:
+                    last_emit = now
+                    self.updated.emit()
+            self.updated.emit()
+        except Exception as error:
+            self.failed.emit(f"Sensor unavailable: {error}")
+        finally:
+            self.source.close()
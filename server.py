@@ -0,0 +1,449 @@
+"""
+Headless HTTP service for the Vitamin D model, for mobile clients and
+batch jobs. Runs on asyncio with the standard library only:
+
+    python server.py --port 8080
+
+Requests and responses are JSON. Exposure fields default to the saved
+user settings (user_data.json) where one is left out.
+
+    POST /vitamin-d   {"start_time": "HH:MM", "duration": seconds, "body":
+                      mask or body dict, "gps": [lat, lng], "skin_type",
+                      "age"}, or {"exposures": [...]} for a batch
+                      -> {"reading", "uvi"} or {"readings", "uvi"}
+    POST /entries     a log entry like the LOG view's: {"start_time",
+                      "end_time", "body", "location": address}, or
+                      {"entries": [...]}; computed and saved for the
+                      client's today
+
+Times are the client's wall clock: give "timezone" (IANA name) or
+"utc_offset" (minutes ahead of UTC) with an exposure or entry, or at the
+top of a batch. Without either the offset is guessed from the longitude.
+    GET  /entries?day=dd-mm-yyyy
+    GET  /totals?day=dd-mm-yyyy    daily, weekly and monthly IU
+    GET  /health
+
+Forecast and geocode lookups block, so they run on a thread pool, and
+concurrent requests for the same place share one lookup. Batches over
+batch_size exposures are computed on a second pool. The tracker is only
+touched on the event loop's thread.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import calculator
+import forecast
+import geocode
+import solar
+from data import UserData, VitaminDTracker
+from headless import (
+    age,
+    body_mask,
+    local_time,
+    seconds_of_day,
+    skin_type,
+    use_headless_forecast,
+)
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Lookups:
+    """
+    Runs fetch(argument) on the executor, one call per key at a time:
+    requests arriving while a lookup is in flight await the same future.
+    cached(key), if given, answers from memory without leaving the loop.
+    """
+
+    def __init__(self, executor, fetch, key, cached=None):
+        self.executor = executor
+        self.fetch = fetch
+        self.key = key
+        self.cached = cached
+        self.pending = {}
+        self.calls = 0
+
+    async def get(self, argument):
+        key = self.key(argument)
+        if self.cached:
+            value = self.cached(key)
+            if value is not None:
+                return value
+
+        future = self.pending.get(key)
+        if future is None:
+            self.calls += 1
+            future = asyncio.get_running_loop().run_in_executor(
+                self.executor, self.fetch, argument
+            )
+            self.pending[key] = future
+            future.add_done_callback(lambda _: self.pending.pop(key, None))
+        # a client going away mustn't cancel the lookup for the others
+        return await asyncio.shield(future)
+
+
+def forecast_key(gps_coordinates):
+    return forecast.ForecastClient.key(gps_coordinates)
+
+
+def cached_forecast(key):
+    return forecast.get_client().cached(key)
+
+
+def fetch_forecast(gps_coordinates):
+    return forecast.get_client().uvi(gps_coordinates)
+
+
+def fetch_location(text_address):
+    return geocode.get_geocoder().lookup(text_address)
+
+
+def compute_readings(exposures, peaks, first_day):
+    """
+    IU and effective UVI for parsed exposures. peaks maps each exposure's
+    coordinates to the daily clear-sky peak UVI forecast from first_day
+    (UTC) on.
+    """
+    starts = np.array([exposure["start"] for exposure in exposures])
+    durations = np.array([exposure["duration"] for exposure in exposures])
+    places = {}
+    for index, exposure in enumerate(exposures):
+        place = (exposure["gps"], exposure["date"], exposure["utc_offset"])
+        places.setdefault(place, []).append(index)
+
+    # one diurnal curve per location and local day
+    uvi = np.zeros(len(exposures))
+    for (gps, date, utc_offset), indexes in places.items():
+        days = peaks[gps]
+        peak = days[min(max((date - first_day).days, 0), len(days) - 1)]
+        uvi[indexes] = peak * solar.interval_fractions(
+            gps, date, starts[indexes], durations[indexes], utc_offset
+        )
+
+    readings = calculator.calculate_vitamin_d_batch(
+        durations,
+        np.array([exposure["body"] for exposure in exposures]),
+        uvi,
+        [exposure["skin_type"] for exposure in exposures],
+        np.array([exposure["age"] for exposure in exposures]),
+    )
+    return readings, uvi
+
+
+class Server:
+    # exposures computed inline below this, on the batch pool above it
+    batch_size = 256
+    max_body = 16 << 20
+
+    def __init__(self, tracker, user_data, workers=8):
+        self.tracker = tracker
+        self.user_data = user_data
+        self.io = ThreadPoolExecutor(workers, thread_name_prefix="lookup")
+        self.cpu = ThreadPoolExecutor(os.cpu_count(), thread_name_prefix="batch")
+        self.forecasts = Lookups(self.io, fetch_forecast, forecast_key, cached_forecast)
+        self.locations = Lookups(self.io, fetch_location, geocode.normalize_address)
+        self.routes = {
+            ("POST", "/vitamin-d"): self.post_vitamin_d,
+            ("POST", "/entries"): self.post_entries,
+            ("GET", "/entries"): self.get_entries,
+            ("GET", "/totals"): self.get_totals,
+            ("GET", "/health"): self.get_health,
+        }
+
+    # --- HTTP --- #
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                # a request that can't be read ends the connection
+                keep_alive = False
+                try:
+                    request = await self.read_request(reader)
+                    if request is None:
+                        break
+                    method, path, query, body, keep_alive = request
+                    payload = await self.dispatch(method, path, query, body)
+                    status = 200
+                except HttpError as error:
+                    status, payload = error.status, {"error": str(error)}
+                except (KeyError, ValueError, TypeError) as error:
+                    status, payload = 400, {"error": f"bad request: {error!r}"}
+                except Exception as error:
+                    traceback.print_exc()
+                    status, payload = 500, {"error": str(error)}
+
+                self.write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HttpError(400, "malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip().lower()
+
+        length = int(headers.get("content-length", 0))
+        if length > self.max_body:
+            raise HttpError(413, f"body over {self.max_body} bytes")
+        body = await reader.readexactly(length) if length else b""
+
+        connection = headers.get("connection", "")
+        if version == "HTTP/1.0":
+            keep_alive = connection == "keep-alive"
+        else:
+            keep_alive = connection != "close"
+
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        return method, url.path, query, body, keep_alive
+
+    @staticmethod
+    def write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+            ).encode("latin-1")
+            + body
+        )
+
+    async def dispatch(self, method, path, query, body):
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                raise HttpError(405, f"{method} not allowed on {path}")
+            raise HttpError(404, f"no route for {path}")
+        if method == "POST":
+            request = json.loads(body or b"{}")
+            if not isinstance(request, dict):
+                raise HttpError(400, "request body must be a JSON object")
+            return await handler(request)
+        return await handler(query)
+
+    # --- model --- #
+
+    def defaults(self):
+        return self.user_data.data or {}
+
+    def parse_exposure(self, item):
+        defaults = self.defaults()
+        gps = item["gps"] if "gps" in item else defaults["location"][1]
+        gps = (float(gps[0]), float(gps[1]))
+        date, utc_offset = local_time(item, gps)
+        return {
+            "gps": gps,
+            "date": date,
+            "utc_offset": utc_offset,
+            "start": seconds_of_day(item["start_time"]),
+            "duration": int(item["duration"]),
+            "body": body_mask(item["body"]),
+            "skin_type": str(
+                skin_type(
+                    item["skin_type"] if "skin_type" in item else defaults["skin_type"]
+                )
+            ),
+            "age": age(item["age"] if "age" in item else defaults["age"]),
+        }
+
+    async def peaks(self, exposures):
+        """
+        The daily clear-sky peak UVI forecast for every location in the
+        exposures, looked up concurrently.
+        """
+        places = sorted({exposure["gps"] for exposure in exposures})
+        try:
+            values = await asyncio.gather(
+                *(self.forecasts.get(place) for place in places)
+            )
+        except Exception as error:
+            raise HttpError(502, f"UV forecast unavailable: {error}")
+        return {place: value[1].tolist() for place, value in zip(places, values)}
+
+    async def compute(self, exposures):
+        peaks = await self.peaks(exposures)
+        # forecast days are UTC days
+        first_day = datetime.now(timezone.utc).date()
+        if len(exposures) < self.batch_size:
+            return compute_readings(exposures, peaks, first_day)
+        return await asyncio.get_running_loop().run_in_executor(
+            self.cpu, compute_readings, exposures, peaks, first_day
+        )
+
+    @staticmethod
+    def batch(request, key):
+        # a timezone at the top of a batch applies to every item without one
+        if key not in request:
+            return [request]
+        shared = {
+            field: request[field]
+            for field in ("timezone", "utc_offset")
+            if request.get(field) is not None
+        }
+        return [dict(shared, **item) for item in request[key]]
+
+    async def post_vitamin_d(self, request):
+        items = self.batch(request, "exposures")
+        readings, uvi = await self.compute(
+            [self.parse_exposure(item) for item in items]
+        )
+        if "exposures" in request:
+            return {"readings": readings.tolist(), "uvi": uvi.tolist()}
+        return {"reading": int(readings[0]), "uvi": float(uvi[0])}
+
+    async def locate(self, items):
+        # (name, gps) per log entry, geocoding the addresses given
+        defaults = self.defaults()
+        addresses = sorted({item["location"] for item in items if item.get("location")})
+        try:
+            found = await asyncio.gather(
+                *(self.locations.get(address) for address in addresses)
+            )
+        except Exception as error:
+            raise HttpError(502, f"geocoding unavailable: {error}")
+        found = dict(zip(addresses, found))
+
+        places = []
+        for item in items:
+            if found.get(item.get("location")):
+                places.append((item["location"], found[item["location"]]))
+            else:
+                places.append(tuple(defaults["location"]))
+        return places
+
+    async def post_entries(self, request):
+        items = self.batch(request, "entries")
+        places = await self.locate(items)
+
+        exposures = []
+        for item, (_, gps) in zip(items, places):
+            duration = abs(
+                seconds_of_day(item["end_time"]) - seconds_of_day(item["start_time"])
+            )
+            exposures.append(
+                self.parse_exposure(dict(item, gps=gps, duration=duration))
+            )
+        readings, uvi = await self.compute(exposures)
+
+        saved = [
+            (
+                exposure["date"].strftime("%d-%m-%Y"),
+                item["start_time"],
+                {
+                    "duration": str(exposure["duration"]),
+                    "reading": str(int(reading)),
+                    "location": name,
+                    "body": exposure["body"],
+                    "uvi": float(value),
+                    "skin_type": exposure["skin_type"],
+                    "age": exposure["age"],
+                },
+            )
+            for item, (name, _), exposure, reading, value in zip(
+                items, places, exposures, readings, uvi
+            )
+        ]
+        self.tracker.add_entries(saved)
+
+        result = [
+            {"day": day, "time": time, "reading": int(entry["reading"])}
+            for day, time, entry in saved
+        ]
+        return {"entries": result} if "entries" in request else result[0]
+
+    def day(self, query):
+        day = query.get("day") or datetime.now().strftime("%d-%m-%Y")
+        datetime.strptime(day, "%d-%m-%Y")
+        return day
+
+    async def get_entries(self, query):
+        day = self.day(query)
+        return {"day": day, "entries": self.tracker.day_entries(day)}
+
+    async def get_totals(self, query):
+        day = self.day(query)
+        return {
+            "day": day,
+            "daily": self.tracker.daily_total(day),
+            "weekly": self.tracker.weekly_total(day),
+            "monthly": self.tracker.monthly_total(day),
+        }
+
+    async def get_health(self, query):
+        return {
+            "status": "ok",
+            "forecast_lookups": self.forecasts.calls,
+            "geocode_lookups": self.locations.calls,
+        }
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        print(f"Serving on http://{host}:{port}")
+
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stopping.set)
+
+        async with server:
+            await stopping.wait()
+        self.io.shutdown(wait=False)
+        self.cpu.shutdown(wait=False)
+        self.tracker.backup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    use_headless_forecast()
+    server = Server(VitaminDTracker(), UserData(), args.workers)
+    asyncio.run(server.serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Live Vitamin D sessions from the lux sensor.
+"""
+import threading
+from datetime import datetime
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+import calculator
+import constants
+from records import body_to_mask
+
+
+class LiveSession:
+    """
+    Running UV dose for one session, fed one sample at a time on the sensor
+    thread.
+
+    Lux is turned into UVI with a fixed outdoor calibration
+    (constants.lux_per_uvi) and summed as UVI-seconds. Holick's rule is
+    linear in uvi * t, so the reading at any point is holick() of the dose.
+    """
+
+    def __init__(self, body, skin_type, age, lux_per_uvi=None, max_gap=5):
+        self.mask = body_to_mask(body)
+        self.skin_type = skin_type
+        self.age = age
+        self.bsa = float(calculator.compute_bsa(self.mask, age))
+        self.med = constants.med[skin_type]
+        self.lux_per_uvi = lux_per_uvi if lux_per_uvi else constants.lux_per_uvi
+        # longer gaps between samples (sensor stalls) aren't counted
+        self.max_gap = max_gap
+
+        self.started = None
+        self.last = None
+        self.duration = 0.0
+        self.dose = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, timestamp, lux):
+        with self.lock:
+            if self.last is None:
+                self.started = timestamp
+            else:
+                seconds = min(timestamp - self.last, self.max_gap)
+                if seconds > 0:
+                    self.duration += seconds
+                    self.dose += lux / self.lux_per_uvi * seconds
+            self.last = timestamp
+
+    def vitamin_d(self):
+        with self.lock:
+            dose = self.dose
+        return int(calculator.holick(dose, 1, self.bsa, self.med))
+
+    def entry(self, location):
+        """
+        The session as a (day, start_time, entry) item for add_entry().
+        """
+        with self.lock:
+            duration = int(round(self.duration))
+            uvi = self.dose / self.duration if self.duration else 0.0
+            started = datetime.fromtimestamp(self.started)
+        vitamin_d = int(calculator.holick(uvi, duration, self.bsa, self.med))
+
+        return (
+            started.strftime("%d-%m-%Y"),
+            started.strftime("%H:%M"),
+            {
+                "duration": str(duration),
+                "reading": str(vitamin_d),
+                "location": location,
+                "body": self.mask,
+                "uvi": uvi,
+                "skin_type": self.skin_type,
+                "age": self.age,
+            },
+        )
+
+
+class SessionRecorder(QObject):
+    """
+    Feeds a LiveSession from the sensor and saves it as a log entry when it
+    ends. Lives on the window so a session outlasts its view.
+    """
+
+    started = pyqtSignal()
+    stopped = pyqtSignal(str)
+    saved = pyqtSignal(str, str)
+
+    def __init__(self, tracker, user_data, sensor):
+        super().__init__()
+        self.tracker = tracker
+        self.user_data = user_data
+        self.sensor = sensor
+        self.session = None
+
+    def start(self, body):
+        if self.session:
+            return
+
+        self.session = LiveSession(
+            body, self.user_data.data["skin_type"], self.user_data.data["age"]
+        )
+        self.sensor.add_consumer(self.session.add)
+        self.started.emit()
+
+    def stop(self):
+        if not self.session:
+            return
+
+        session, self.session = self.session, None
+        self.sensor.remove_consumer(session.add)
+
+        if session.duration < 1:
+            self.stopped.emit("No sensor readings in this session")
+            return
+
+        day, time, entry = session.entry(self.user_data.data["location"][0])
+        self.tracker.add_entry(day, time, entry)
+        self.stopped.emit(f"Saved {entry['reading']} IU at {time}")
+        self.saved.emit(day, time)
@@ -0,0 +1,141 @@
+"""
+Clear-sky diurnal UV curve from solar geometry.
+
+The daily forecast only gives the peak UV index. Within the day the clear
+sky UVI follows the cosine of the solar zenith angle, UVI ~ mu ** 2.42
+(Madronich, 2007), so the curve is mu ** 2.42 normalised to 1 at solar
+noon and scaled by the forecast peak.
+"""
+from datetime import datetime, time
+from functools import lru_cache
+
+import numpy as np
+
+UV_EXPONENT = 2.42
+MINUTES = 24 * 60
+
+
+def cos_zenith(latitude, longitude, date, utc_minutes):
+    """
+    Cosine of the solar zenith angle (NOAA approximation) at the given UTC
+    minutes of the day. Vectorized over utc_minutes.
+    """
+    day_of_year = date.timetuple().tm_yday
+    gamma = 2 * np.pi / 365 * (day_of_year - 1 + (utc_minutes / 60 - 12) / 24)
+
+    equation_of_time = 229.18 * (
+        0.000075
+        + 0.001868 * np.cos(gamma)
+        - 0.032077 * np.sin(gamma)
+        - 0.014615 * np.cos(2 * gamma)
+        - 0.040849 * np.sin(2 * gamma)
+    )
+    declination = (
+        0.006918
+        - 0.399912 * np.cos(gamma)
+        + 0.070257 * np.sin(gamma)
+        - 0.006758 * np.cos(2 * gamma)
+        + 0.000907 * np.sin(2 * gamma)
+        - 0.002697 * np.cos(3 * gamma)
+        + 0.00148 * np.sin(3 * gamma)
+    )
+
+    true_solar_minutes = utc_minutes + equation_of_time + 4 * longitude
+    hour_angle = np.radians(true_solar_minutes / 4 - 180)
+    latitude = np.radians(latitude)
+
+    return np.sin(latitude) * np.sin(declination) + np.cos(latitude) * np.cos(
+        declination
+    ) * np.cos(hour_angle)
+
+
+def local_offset(date):
+    """
+    This machine's offset from UTC in minutes, at noon on the date.
+    """
+    offset = datetime.combine(date, time(12)).astimezone().utcoffset()
+    return int(offset.total_seconds() // 60)
+
+
+@lru_cache(maxsize=64)
+def _day_curve(latitude, longitude, date, utc_offset):
+    # local wall-clock minute -> UTC minute
+    local_minutes = np.arange(MINUTES, dtype=np.float64)
+    utc_minutes = local_minutes - utc_offset
+
+    mu = np.clip(cos_zenith(latitude, longitude, date, utc_minutes), 0, None)
+    curve = mu**UV_EXPONENT
+    if curve.max() > 0:
+        curve /= curve.max()
+
+    curve.setflags(write=False)
+    return curve
+
+
+def day_curve(gps_coordinates, date, utc_offset=None):
+    """
+    Fraction of the day's peak UVI for each local minute of the day.
+    Local time is utc_offset minutes ahead of UTC, this machine's
+    timezone if None.
+    """
+    return _day_curve(
+        round(float(gps_coordinates[0]), 2),
+        round(float(gps_coordinates[1]), 2),
+        date,
+        local_offset(date) if utc_offset is None else int(utc_offset),
+    )
+
+
+def interval_fraction(gps_coordinates, date, start_secs, duration, utc_offset=None):
+    """
+    Mean fraction of the peak UVI over [start, start + duration] seconds
+    after local midnight, integrated at minute resolution.
+    """
+    if duration <= 0:
+        return 0.0
+
+    curve = day_curve(gps_coordinates, date, utc_offset)
+    end_secs = start_secs + duration
+
+    minutes = np.arange(start_secs // 60, -(-end_secs // 60))
+    edges = minutes * 60
+    covered = np.clip(
+        np.minimum(edges + 60, end_secs) - np.maximum(edges, start_secs), 0, 60
+    )
+
+    return float(np.dot(curve.take(minutes, mode="wrap"), covered) / duration)
+
+
+@lru_cache(maxsize=64)
+def _day_integral(latitude, longitude, date, utc_offset):
+    # running integral of the curve over each minute's 60 seconds
+    curve = _day_curve(latitude, longitude, date, utc_offset)
+    integral = np.r_[0, np.cumsum(curve * 60)]
+    integral.setflags(write=False)
+    return integral
+
+
+def interval_fractions(gps_coordinates, date, start_secs, durations, utc_offset=None):
+    """
+    interval_fraction() for many exposures at one location, from a running
+    integral of the curve instead of a loop per exposure.
+    """
+    latitude = round(float(gps_coordinates[0]), 2)
+    longitude = round(float(gps_coordinates[1]), 2)
+    if utc_offset is None:
+        utc_offset = local_offset(date)
+    curve = _day_curve(latitude, longitude, date, int(utc_offset))
+    integral = _day_integral(latitude, longitude, date, int(utc_offset))
+
+    def area(secs):
+        # integral of the curve from midnight to secs, wrapping past midnight
+        days, secs = np.divmod(secs, MINUTES * 60)
+        minutes = secs // 60
+        return days * integral[-1] + integral[minutes] + curve[minutes] * (secs % 60)
+
+    start_secs = np.asarray(start_secs, dtype=np.int64)
+    durations = np.asarray(durations, dtype=np.int64)
+    covered = area(start_secs + np.maximum(durations, 0)) - area(start_secs)
+    return np.divide(
+        covered, durations, out=np.zeros(covered.shape), where=durations > 0
+    )
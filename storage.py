@@ -0,0 +1,526 @@
+import json
+import os
+import sqlite3
+import stat
+import tempfile
+import threading
+import traceback
+from datetime import datetime
+
+from records import Entry, LocationTable, body_to_mask, mask_to_body
+
+
+class JournalStore:
+    """
+    Append-only journal of entry changes on top of a JSON snapshot.
+
+    Every new or changed entry is appended to the journal as one JSON line,
+    the snapshot (entries.json) is only rewritten when the journal is
+    compacted. load() replays the journal over the snapshot.
+    """
+
+    def __init__(
+        self,
+        snapshot_path="entries.json",
+        journal_path="entries.journal",
+        compact_every=500,
+    ):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.compact_every = compact_every
+        self.journal_file = None
+        self.journal_records = 0
+        # (thread, journal offset, records) of a compaction in progress
+        self.compaction = None
+        self.compaction_failed = False
+
+    def load(self):
+        entries = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path) as file:
+                entries = json.loads(file.read())
+
+        self.journal_records = 0
+        if not os.path.exists(self.journal_path):
+            return entries
+
+        valid_length = 0
+        with open(self.journal_path, "rb") as file:
+            for number, line in enumerate(file, 1):
+                # a torn last line means we crashed mid-append, drop it
+                if not line.endswith(b"\n"):
+                    break
+                # a bad complete line is damage, truncating there would
+                # throw away every record after it
+                try:
+                    record = json.loads(line)
+                except ValueError as error:
+                    raise ValueError(
+                        f"{self.journal_path} line {number} is corrupt: {error}"
+                    )
+
+                self.apply(entries, record)
+                valid_length += len(line)
+                self.journal_records += 1
+
+        if valid_length != os.path.getsize(self.journal_path):
+            with open(self.journal_path, "r+b") as file:
+                file.truncate(valid_length)
+
+        return entries
+
+    @staticmethod
+    def apply(entries, record):
+        day = entries.setdefault(record["day"], {})
+        if record["entry"] is None:
+            day.pop(record["time"], None)
+        else:
+            day[record["time"]] = record["entry"]
+
+    def append(self, day, time, entry):
+        self.append_many([(day, time, entry)])
+
+    def append_many(self, items):
+        """
+        Append several records with a single write and fsync.
+        """
+        records = b"".join(
+            json.dumps(
+                {"day": day, "time": time, "entry": entry}, separators=(",", ":")
+            ).encode()
+            + b"\n"
+            for day, time, entry in items
+        )
+        self.finish_compaction()
+        if self.journal_file is None:
+            self.journal_file = open(self.journal_path, "ab")
+
+        self.journal_file.write(records)
+        self.journal_file.flush()
+        os.fsync(self.journal_file.fileno())
+        self.journal_records += len(items)
+
+    def needs_compaction(self):
+        return self.compaction is None and self.journal_records >= self.compact_every
+
+    def compact(self, entries):
+        """
+        Fold the journal into a fresh snapshot.
+
+        The snapshot is swapped in atomically before the journal is
+        truncated. Replaying records onto a snapshot that already holds them
+        is harmless, so a crash between the two steps loses nothing.
+        """
+        self.finish_compaction(wait=True)
+        if not self.journal_records and os.path.exists(self.snapshot_path):
+            return
+
+        write_atomic(self.snapshot_path, json.dumps(entries, indent=4))
+
+        self.close()
+        with open(self.journal_path, "wb") as file:
+            os.fsync(file.fileno())
+        self.journal_records = 0
+
+    def compact_in_background(self, days):
+        """
+        Like compact(), but the snapshot is written on a worker thread so
+        appends don't wait for it. days() runs on that thread and yields
+        (day, {time: entry}) pairs the caller no longer mutates. Records
+        appended meanwhile stay in the journal; the first append after the
+        snapshot is in place cuts the journal down to them.
+        """
+        if self.compaction is not None:
+            return
+        if self.journal_file is not None:
+            self.journal_file.flush()
+        offset = (
+            os.path.getsize(self.journal_path)
+            if os.path.exists(self.journal_path)
+            else 0
+        )
+
+        self.compaction_failed = False
+        thread = threading.Thread(target=self.write_snapshot, args=(days,))
+        self.compaction = (thread, offset, self.journal_records)
+        thread.start()
+
+    def write_snapshot(self, days):
+        try:
+            write_atomic(self.snapshot_path, snapshot_chunks(days()))
+        except Exception:
+            traceback.print_exc()
+            self.compaction_failed = True
+
+    def finish_compaction(self, wait=False):
+        if self.compaction is None:
+            return
+        thread, offset, records = self.compaction
+        if thread.is_alive():
+            if not wait:
+                return
+            thread.join()
+        self.compaction = None
+        if self.compaction_failed:
+            # the journal still has everything, try again later
+            return
+
+        # keep only the records appended while the snapshot was written
+        self.close()
+        with open(self.journal_path, "rb") as file:
+            file.seek(offset)
+            tail = file.read()
+        write_atomic(self.journal_path, tail)
+        self.journal_records -= records
+
+    def close(self):
+        if self.journal_file is not None:
+            self.journal_file.close()
+            self.journal_file = None
+
+
+def snapshot_chunks(days):
+    """
+    json.dumps(dict(days), indent=4) a day at a time, so neither the whole
+    dict nor the whole text is ever built, and no single call holds the GIL
+    for long.
+    """
+    encoder = json.JSONEncoder(indent=4)
+    separator = "{"
+    for day, times in days:
+        # '{\n    "day": {...}\n}' without its outer braces
+        yield separator + encoder.encode({day: times})[1:-2]
+        separator = ","
+    yield "{}" if separator == "{" else "\n}"
+
+
+def write_atomic(path, data):
+    """
+    data is text, bytes or an iterable of text chunks.
+    """
+    # a temp file of its own, so concurrent writers can't move each
+    # other's away
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=name + ".", suffix=".tmp", dir=directory)
+    try:
+        if os.path.exists(path):
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+        with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w") as file:
+            file.writelines([data] if isinstance(data, (str, bytes)) else data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # persist the rename itself
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class JsonEntryStore:
+    """
+    Default backend: entries kept in memory as compact Entry records and
+    persisted in the JSON schema through a JournalStore.
+    """
+
+    def __init__(self, journal=None):
+        self.journal = journal if journal else JournalStore()
+        self.locations = LocationTable()
+        self.entries = {}
+
+    def load(self):
+        self.locations = LocationTable()
+        self.entries = {
+            day: {
+                time: Entry.from_json(entry, self.locations)
+                for time, entry in times.items()
+            }
+            for day, times in self.journal.load().items()
+        }
+
+    def add_day(self, day):
+        if day not in self.entries:
+            self.entries[day] = {}
+
+    def add_entry(self, day, time, entry):
+        self.add_day(day)
+        self.entries[day][time] = Entry.from_json(entry, self.locations)
+        self.journal.append(day, time, entry)
+
+        if self.journal.needs_compaction():
+            self.compact_in_background()
+
+    def add_entries(self, items):
+        for day, time, entry in items:
+            self.add_day(day)
+            self.entries[day][time] = Entry.from_json(entry, self.locations)
+        self.journal.append_many(items)
+
+        if self.journal.needs_compaction():
+            self.compact_in_background()
+
+    def get_entry(self, day, time):
+        return self.entries[day][time].to_json(self.locations)
+
+    def day_entries(self, day):
+        return {
+            time: entry.to_json(self.locations)
+            for time, entry in self.entries.get(day, {}).items()
+        }
+
+    def days(self):
+        return sorted(self.entries.keys(), key=to_iso_day)
+
+    def sorted_times(self, day):
+        return sorted(
+            self.entries.get(day, {}).keys(),
+            key=lambda time_str: datetime.strptime(time_str, "%H:%M").time(),
+        )
+
+    def daily_total(self, day):
+        return sum(entry.reading for entry in self.entries.get(day, {}).values())
+
+    def daily_totals(self, first_day, last_day):
+        first_day = to_iso_day(first_day)
+        last_day = to_iso_day(last_day)
+        return [
+            (day, self.daily_total(day))
+            for day in sorted(self.entries, key=to_iso_day)
+            if first_day <= to_iso_day(day) <= last_day
+        ]
+
+    def range_total(self, first_day, last_day):
+        return sum(total for _, total in self.daily_totals(first_day, last_day))
+
+    def readings(self):
+        for day, times in self.entries.items():
+            for entry in times.values():
+                yield day, entry.reading
+
+    def all_entries(self):
+        for day, times in self.entries.items():
+            for time, entry in times.items():
+                yield day, time, entry.to_json(self.locations)
+
+    def to_json(self):
+        return {day: self.day_json(times) for day, times in self.entries.items()}
+
+    def day_json(self, times):
+        return {time: entry.to_json(self.locations) for time, entry in times.items()}
+
+    def compact_in_background(self):
+        # entries are replaced, never changed in place, so copying the day
+        # dicts is enough to hand them to the compaction thread
+        entries = {day: dict(times) for day, times in self.entries.items()}
+        self.journal.compact_in_background(
+            lambda: ((day, self.day_json(times)) for day, times in entries.items())
+        )
+
+    def flush(self):
+        if self.journal.journal_records:
+            self.journal.compact(self.to_json())
+
+    def close(self):
+        self.flush()
+        self.journal.close()
+
+
+class SQLiteEntryStore:
+    """
+    Entries in an SQLite table keyed by (day, start_time) with typed columns.
+
+    Days are stored as ISO dates so range queries for week, month and year
+    views are index seeks. On first use the database is seeded from the JSON
+    snapshot and journal if they exist.
+    """
+
+    columns = "duration, reading, location, body, uvi, skin_type, age"
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS days (
+            day TEXT PRIMARY KEY
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS entries (
+            day TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            reading INTEGER NOT NULL,
+            location TEXT NOT NULL,
+            body INTEGER NOT NULL,
+            uvi REAL,
+            skin_type TEXT,
+            age INTEGER,
+            PRIMARY KEY (day, start_time)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS entries_day_reading ON entries (day, reading);
+    """
+
+    def __init__(self, path="entries.db", migrate_from=None):
+        self.path = path
+        self.migrate_from = migrate_from if migrate_from else JsonEntryStore()
+        self.db = None
+
+    def load(self):
+        if self.db is None:
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(self.schema)
+
+        if self.db.execute("SELECT 1 FROM days LIMIT 1").fetchone() is None:
+            self.migrate(self.migrate_from)
+
+    def migrate(self, source):
+        source.load()
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO days VALUES (?)",
+                [(to_iso_day(day),) for day in source.days()],
+            )
+            self.db.executemany(
+                self.insert_entry,
+                (self.to_row(*entry) for entry in source.all_entries()),
+            )
+
+    @staticmethod
+    def to_row(day, time, entry):
+        return (
+            to_iso_day(day),
+            time,
+            int(entry["duration"]),
+            int(entry["reading"]),
+            entry["location"],
+            body_to_mask(entry["body"]),
+            entry.get("uvi"),
+            entry.get("skin_type"),
+            entry.get("age"),
+        )
+
+    @staticmethod
+    def from_row(row):
+        duration, reading, location, body, uvi, skin_type, age = row
+        entry = {
+            "duration": str(duration),
+            "reading": str(reading),
+            "location": location,
+            "body": mask_to_body(body),
+        }
+        for field, value in (("uvi", uvi), ("skin_type", skin_type), ("age", age)):
+            if value is not None:
+                entry[field] = value
+        return entry
+
+    @property
+    def insert_entry(self):
+        return (
+            f"INSERT OR REPLACE INTO entries (day, start_time, {self.columns})"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        )
+
+    def add_day(self, day):
+        with self.db:
+            self.db.execute("INSERT OR IGNORE INTO days VALUES (?)", (to_iso_day(day),))
+
+    def add_entry(self, day, time, entry):
+        with self.db:
+            self.db.execute("INSERT OR IGNORE INTO days VALUES (?)", (to_iso_day(day),))
+            self.db.execute(self.insert_entry, self.to_row(day, time, entry))
+
+    def add_entries(self, items):
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO days VALUES (?)",
+                {(to_iso_day(day),) for day, _, _ in items},
+            )
+            self.db.executemany(
+                self.insert_entry, [self.to_row(*item) for item in items]
+            )
+
+    def get_entry(self, day, time):
+        row = self.db.execute(
+            f"SELECT {self.columns} FROM entries WHERE day = ? AND start_time = ?",
+            (to_iso_day(day), time),
+        ).fetchone()
+        if row is None:
+            raise KeyError((day, time))
+
+        return self.from_row(row)
+
+    def day_entries(self, day):
+        rows = self.db.execute(
+            f"SELECT start_time, {self.columns} FROM entries"
+            " WHERE day = ? ORDER BY start_time",
+            (to_iso_day(day),),
+        )
+        return {row[0]: self.from_row(row[1:]) for row in rows}
+
+    def days(self):
+        rows = self.db.execute("SELECT day FROM days ORDER BY day")
+        return [from_iso_day(row[0]) for row in rows]
+
+    def sorted_times(self, day):
+        rows = self.db.execute(
+            "SELECT start_time FROM entries WHERE day = ? ORDER BY start_time",
+            (to_iso_day(day),),
+        )
+        return [row[0] for row in rows]
+
+    def daily_total(self, day):
+        return self.db.execute(
+            "SELECT COALESCE(SUM(reading), 0) FROM entries WHERE day = ?",
+            (to_iso_day(day),),
+        ).fetchone()[0]
+
+    def daily_totals(self, first_day, last_day):
+        rows = self.db.execute(
+            "SELECT days.day, COALESCE(SUM(entries.reading), 0) FROM days"
+            " LEFT JOIN entries ON entries.day = days.day"
+            " WHERE days.day BETWEEN ? AND ? GROUP BY days.day ORDER BY days.day",
+            (to_iso_day(first_day), to_iso_day(last_day)),
+        )
+        return [(from_iso_day(day), total) for day, total in rows]
+
+    def range_total(self, first_day, last_day):
+        return self.db.execute(
+            "SELECT COALESCE(SUM(reading), 0) FROM entries WHERE day BETWEEN ? AND ?",
+            (to_iso_day(first_day), to_iso_day(last_day)),
+        ).fetchone()[0]
+
+    def readings(self):
+        for day, reading in self.db.execute("SELECT day, reading FROM entries"):
+            yield from_iso_day(day), reading
+
+    def all_entries(self):
+        rows = self.db.execute(f"SELECT day, start_time, {self.columns} FROM entries")
+        for row in rows:
+            yield from_iso_day(row[0]), row[1], self.from_row(row[2:])
+
+    def flush(self):
+        self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+def to_iso_day(day):
+    return datetime.strptime(day, "%d-%m-%Y").strftime("%Y-%m-%d")
+
+
+def from_iso_day(day):
+    return datetime.strptime(day, "%Y-%m-%d").strftime("%d-%m-%Y")
+
+
+def make_store(backend):
+    if backend == "sqlite":
+        return SQLiteEntryStore()
+
+    return JsonEntryStore()
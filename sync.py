@@ -0,0 +1,194 @@
+"""
+Log entries in a DynamoDB table (constants.dynamodb_table).
+
+Items are keyed by user (partition key "user") and "<iso day> <time>"
+(sort key "entry"), and hold the entry as JSON with the time it was
+changed in ms ("updated", on the changing device's clock, for
+last-writer-wins) and the device that changed it. Each write also takes
+the user's next sequence number ("seq") from a counter item, so the
+table's "seq" index (user, seq) lets a device read what was written
+since its last pull, however late or skewed the edit times are.
+workers.EntrySync decides what to push and pull.
+
+boto3 is only imported once a client is needed. Point
+constants.dynamodb_endpoint at DynamoDB Local to try it without AWS.
+"""
+import json
+import random
+from time import sleep
+
+from records import body_to_mask, mask_to_body
+from storage import from_iso_day, to_iso_day
+
+# DynamoDB's limit per batch_write_item call
+BATCH_SIZE = 25
+# sort key of the per-user counter item, never a "<iso day> <time>"
+SEQUENCE = "#sequence"
+
+
+class DynamoRemote:
+    def __init__(
+        self,
+        table,
+        user,
+        device,
+        endpoint=None,
+        region=None,
+        client=None,
+        max_retries=8,
+        backoff=0.05,
+        max_backoff=5,
+    ):
+        self.table = table
+        self.user = user
+        self.device = device
+        self.endpoint = endpoint
+        self.region = region
+        self.client = client
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def connect(self):
+        if self.client is None:
+            import boto3
+
+            self.client = boto3.client(
+                "dynamodb", endpoint_url=self.endpoint, region_name=self.region
+            )
+        return self.client
+
+    def create_table(self):
+        """
+        Create the table and its index (on-demand billing) if missing.
+        """
+        client = self.connect()
+        if self.table in client.list_tables()["TableNames"]:
+            return
+
+        client.create_table(
+            TableName=self.table,
+            KeySchema=[
+                {"AttributeName": "user", "KeyType": "HASH"},
+                {"AttributeName": "entry", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "user", "AttributeType": "S"},
+                {"AttributeName": "entry", "AttributeType": "S"},
+                {"AttributeName": "seq", "AttributeType": "N"},
+            ],
+            # pulls read by the order items were written in, not edit times
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "seq",
+                    "KeySchema": [
+                        {"AttributeName": "user", "KeyType": "HASH"},
+                        {"AttributeName": "seq", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                }
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        client.get_waiter("table_exists").wait(TableName=self.table)
+
+    def to_item(self, day, time, entry, updated, seq):
+        # the body goes up as its bitmask, it's most of an entry's size
+        entry = dict(entry, body=body_to_mask(entry["body"]))
+        return {
+            "user": {"S": self.user},
+            "entry": {"S": f"{to_iso_day(day)} {time}"},
+            "updated": {"N": str(updated)},
+            "seq": {"N": str(seq)},
+            "device": {"S": self.device},
+            "data": {"S": json.dumps(entry, separators=(",", ":"))},
+        }
+
+    @staticmethod
+    def from_item(item):
+        day, time = item["entry"]["S"].split(" ")
+        entry = json.loads(item["data"]["S"])
+        entry["body"] = mask_to_body(entry["body"])
+        return (
+            from_iso_day(day),
+            time,
+            entry,
+            int(item["updated"]["N"]),
+            item["device"]["S"],
+            int(item["seq"]["N"]),
+        )
+
+    def reserve(self, count):
+        """
+        The next `count` sequence numbers of the user, from an atomic
+        increment of the counter item.
+        """
+        response = self.connect().update_item(
+            TableName=self.table,
+            Key={"user": {"S": self.user}, "entry": {"S": SEQUENCE}},
+            UpdateExpression="ADD #next :count",
+            ExpressionAttributeNames={"#next": "next"},
+            ExpressionAttributeValues={":count": {"N": str(count)}},
+            ReturnValues="UPDATED_NEW",
+        )
+        last = int(response["Attributes"]["next"]["N"])
+        return range(last - count + 1, last + 1)
+
+    def push(self, items):
+        """
+        Write (day, time, entry, updated) items, BATCH_SIZE per request.
+        Each batch takes its sequence numbers just before it's written.
+        """
+        for first in range(0, len(items), BATCH_SIZE):
+            batch = items[first : first + BATCH_SIZE]
+            requests = [
+                {"PutRequest": {"Item": self.to_item(*item, seq)}}
+                for item, seq in zip(batch, self.reserve(len(batch)))
+            ]
+            self.write_batch(requests)
+
+    def write_batch(self, requests):
+        """
+        Retry whatever DynamoDB leaves unprocessed (throttling), backing off
+        exponentially with jitter.
+        """
+        client = self.connect()
+        for attempt in range(self.max_retries + 1):
+            response = client.batch_write_item(RequestItems={self.table: requests})
+            requests = response.get("UnprocessedItems", {}).get(self.table)
+            if not requests:
+                return
+            if attempt < self.max_retries:
+                delay = min(self.backoff * 2**attempt, self.max_backoff)
+                sleep(delay * (0.5 + random.random() / 2))
+
+        raise RuntimeError(f"{len(requests)} items still unprocessed")
+
+    def pull(self, since):
+        """
+        Items written with a sequence number above `since`, in write order,
+        as (day, time, entry, updated, device, seq), and the highest
+        sequence number seen.
+        """
+        client = self.connect()
+        query = {
+            "TableName": self.table,
+            "IndexName": "seq",
+            "KeyConditionExpression": "#user = :user AND #seq > :since",
+            "ExpressionAttributeNames": {"#user": "user", "#seq": "seq"},
+            "ExpressionAttributeValues": {
+                ":user": {"S": self.user},
+                ":since": {"N": str(since)},
+            },
+        }
+
+        items = []
+        while True:
+            response = client.query(**query)
+            items.extend(self.from_item(item) for item in response["Items"])
+            if "LastEvaluatedKey" not in response:
+                break
+            query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+        high_water = max((item[5] for item in items), default=since)
+        return items, high_water
@@ -1,6 +1,8 @@
 import constants
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from itertools import accumulate
+from functools import lru_cache
 
 from PyQt6 import QtCore, QtGui
 from PyQt6.QtWidgets import (
@@ -18,10 +20,16 @@ from PyQt6.QtWidgets import (
     QGraphicsView,
     QTimeEdit,
     QLineEdit,
+    QStackedWidget,
+    QListView,
+    QStyle,
+    QStyledItemDelegate,
 )
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import numpy as np
+
+from geocode import GeocodeError
+from records import body_to_mask
+from session import SessionRecorder
+from workers import EntrySync, ForecastRefresh, RecomputeJob, SubmissionQueue
 
 
 def SPACING(size):
@@ -100,11 +108,15 @@ class ImageSelector(QWidget):
 
 
 class SettingsView(QWidget):
-    def __init__(self, user_data, tracker, button_callbacks={}):
+    def __init__(
+        self, user_data, tracker, button_callbacks={}, recompute=None, events=None
+    ):
         super().__init__()
         self.user_data = user_data
         self.tracker = tracker
         self.button_callbacks = button_callbacks
+        self.recompute = recompute
+        self.events = events
 
         self.layout = QVBoxLayout(self)
         self.upper_layout = QHBoxLayout()
@@ -230,6 +242,9 @@ class SettingsView(QWidget):
             self.cancelButton.clicked.connect(self.button_callbacks["back"])
         self.lower_layout.addWidget(self.submitButton)
         self.lower_layout.addWidget(self.cancelButton)
+        self.labelStatus = QLabel()
+        self.labelStatus.setObjectName("labelStatus")
+        self.lower_layout.addWidget(self.labelStatus)
         self.layout.addItem(SPACING(5))
 
         self.hline = QFrame()
@@ -240,6 +255,17 @@ class SettingsView(QWidget):
 
         self.layout.addLayout(self.lower_layout)
 
+    def showEvent(self, event):
+        super().showEvent(event)
+
+        # drop edits that were cancelled last time the view was shown
+        self.labelStatus.setText("")
+        if self.user_data.data:
+            self.on_selection(self.user_data.data["skin_type"])
+            self.inputAge.setText(str(self.user_data.data["age"]))
+            self.inputLocation.setText(self.user_data.data["location"][0])
+            self.inputDailyTarget.setText(str(self.user_data.data["target"]))
+
     def on_selection(self, identifier):
         if self.currentSkinType:
             self.skintypeItems[self.currentSkinType].setStyleSheet(
@@ -267,181 +293,219 @@ class SettingsView(QWidget):
         )
 
     def submit_callback(self):
+        previous = self.user_data.data
+        failed = None
+        try:
+            location = (
+                self.inputLocation.text(),
+                self.tracker.convert_text_to_gps(self.inputLocation.text()),
+            )
+        except GeocodeError as error:
+            # quota, rate limit or no connection: keep the saved location
+            failed = f"Location not updated: {error}"
+            if not previous:
+                self.labelStatus.setText(failed)
+                return
+            location = previous["location"]
+
         self.user_data.data = {
             "age": int(self.inputAge.text()),
             "target": int(self.inputDailyTarget.text()),
-            "location": (
-                self.inputLocation.text(),
-                self.tracker.convert_text_to_gps(self.inputLocation.text()),
-            ),
+            "location": location,
             "skin_type": self.currentSkinType,
         }
         self.user_data.save_user_data()
+
+        # bring stored readings in line with the new skin type / age
+        if previous and self.recompute:
+            self.recompute.start(previous, self.user_data.data)
+        if self.events:
+            self.events.settings_changed.emit()
+
+        if failed:
+            # stay here so the message is seen and the lookup can be retried
+            self.labelStatus.setText(failed)
+            return
         self.button_callbacks["back"]()
 
 
-class LogItem(QWidget):
-    def __init__(self, vitamin_d, time, time_duration, location, selection_callback):
-        super(LogItem, self).__init__()
-        self.vitamin_d = vitamin_d
-        self.time = time
-        self.time_duration = time_duration
-        self.location = location
-        self.selection_callback = selection_callback
-        self.init_ui()
+class LogListModel(QtCore.QAbstractListModel):
+    """
+    Rows of (time, duration, reading, location, pending) for one day.
+    """
 
-    def init_ui(self):
-        self.mainLayout = QHBoxLayout()
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self.positions = {}
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
 
-        self.labelTime = QLabel(self.time)
-        self.labelTime.setObjectName("logItem__labelTime")
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == QtCore.Qt.ItemDataRole.DisplayRole:
+            return self.rows[index.row()][0]
+        if role == QtCore.Qt.ItemDataRole.UserRole:
+            return self.rows[index.row()]
+        return None
 
-        self.labelTimeDuration = QLabel(str(self.time_duration) + " secs")
-        self.labelTimeDuration.setObjectName("logItem__labelTimeDuration")
+    def flags(self, index):
+        if not index.isValid() or self.rows[index.row()][4]:
+            return QtCore.Qt.ItemFlag.ItemIsEnabled
+        return QtCore.Qt.ItemFlag.ItemIsEnabled | QtCore.Qt.ItemFlag.ItemIsSelectable
 
-        self.labelVitaminD = QLabel(str(self.vitamin_d))
-        self.labelVitaminD.setObjectName("logItem__labelVitaminD")
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.positions = {row[0]: position for position, row in enumerate(rows)}
+        self.endResetModel()
 
-        layoutContainerFrame = QFrame()
-        layoutContainerFrame.setObjectName("logItem")
-        layoutContainer = QVBoxLayout()
+    def row(self, timestamp):
+        position = self.positions.get(timestamp)
+        return None if position is None else self.rows[position]
 
-        readingsContainer = QHBoxLayout()
+    def index_of(self, timestamp):
+        position = self.positions.get(timestamp)
+        return QtCore.QModelIndex() if position is None else self.index(position)
 
-        readingsContainer.addWidget(self.labelTime)
-        readingsContainer.addItem(SPACING(20))
-        readingsContainer.addWidget(self.labelTimeDuration)
-        readingsContainer.addItem(SPACING_EX(20))
-        readingsContainer.addWidget(self.labelVitaminD)
 
-        layoutContainer.addLayout(readingsContainer)
+class LogItemDelegate(QStyledItemDelegate):
+    """
+    Paints a log row directly, so only visible rows cost anything.
+    """
 
-        readingsLocation = QLabel(f"LOCATION: {self.location}")
-        readingsLocation.setObjectName("readingsLocation")
+    size = QtCore.QSize(415, 80)
 
-        layoutContainer.addWidget(
-            readingsLocation, 0, alignment=QtCore.Qt.AlignmentFlag.AlignRight
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.fonts = {}
+        for name, pixels, weight in (
+            ("time", 28, QtGui.QFont.Weight.Normal),
+            ("reading", 32, QtGui.QFont.Weight.Medium),
+            ("location", 14, QtGui.QFont.Weight.Medium),
+        ):
+            font = QtGui.QFont()
+            font.setPixelSize(pixels)
+            font.setWeight(weight)
+            self.fonts[name] = font
+
+    def sizeHint(self, option, index):
+        return self.size
+
+    def paint(self, painter, option, index):
+        timestamp, time_duration, reading, location, _ = index.data(
+            QtCore.Qt.ItemDataRole.UserRole
         )
+        rect = option.rect.adjusted(9, 4, -9, -4)
+        selected = option.state & QStyle.StateFlag.State_Selected
+        hovered = option.state & QStyle.StateFlag.State_MouseOver
+        blue = QtGui.QColor("#00008B")
+
+        painter.save()
+        painter.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
+
+        if selected:
+            painter.setPen(QtGui.QPen(blue, 2))
+            painter.setBrush(QtGui.QColor("#f8f8f8"))
+            painter.drawRect(rect.adjusted(1, 1, -1, -1))
+        else:
+            if hovered:
+                painter.fillRect(rect, QtGui.QColor("#f8f8f8"))
+                painter.setPen(QtGui.QPen(blue, 2))
+            else:
+                painter.setPen(QtGui.QPen(QtGui.QColor("#c5c5c5"), 1))
+            painter.drawLine(rect.bottomLeft(), rect.bottomRight())
 
-        layoutContainerFrame.setLayout(layoutContainer)
-        layoutContainerFrame.setFixedSize(415, 80)
+        top = rect.adjusted(12, 4, -12, -rect.height() // 2 + 4)
+        left = QtCore.Qt.AlignmentFlag.AlignLeft | QtCore.Qt.AlignmentFlag.AlignVCenter
+        right = (
+            QtCore.Qt.AlignmentFlag.AlignRight | QtCore.Qt.AlignmentFlag.AlignVCenter
+        )
 
-        self.mainLayout.addWidget(layoutContainerFrame)
+        painter.setFont(self.fonts["time"])
+        painter.setPen(QtGui.QColor("#272727"))
+        painter.drawText(top, left, timestamp)
+        painter.drawText(top.adjusted(110, 0, 0, 0), left, f"{time_duration} secs")
+
+        painter.setFont(self.fonts["reading"])
+        painter.setPen(blue)
+        painter.drawText(top, right, f"{reading} IU")
+
+        painter.setFont(self.fonts["location"])
+        painter.setPen(QtGui.QColor("#909090"))
+        painter.drawText(
+            rect.adjusted(12, rect.height() // 2, -12, -6),
+            right,
+            f"LOCATION: {location}",
+        )
 
-        self.setLayout(self.mainLayout)
+        painter.restore()
 
-    def mousePressEvent(self, _):
-        self.selection_callback(self.time)
+
+def body_pixmap():
+    """
+    human_body.jpg decoded and scaled once, then served from QPixmapCache.
+    """
+    key = "human_body_300x700"
+    pixmap = QtGui.QPixmapCache.find(key)
+    if pixmap is None:
+        QtGui.QImageReader.setAllocationLimit(0)
+        pixmap = QtGui.QPixmap("img/human_body.jpg").scaled(300, 700)
+        QtGui.QPixmapCache.insert(key, pixmap)
+    return pixmap
 
 
 class BodyImageView(QWidget):
-    def __init__(self, show_only=True, markers=None):
+    # marker position on the scaled body image
+    marker_positions = {
+        "head": (135, 20),
+        "neck": (135, 75),
+        "left_arm_upper": (50, 150),
+        "left_arm_lower": (35, 250),
+        "left_palm": (25, 350),
+        "right_arm_upper": (225, 150),
+        "right_arm_lower": (240, 250),
+        "right_palm": (250, 350),
+        "torso": (135, 200),
+        "left_leg_upper": (95, 400),
+        "left_leg_lower": (80, 550),
+        "left_feet": (45, 650),
+        "right_leg_upper": (185, 400),
+        "right_leg_lower": (200, 550),
+        "right_feet": (235, 650),
+    }
+
+    def __init__(self, show_only=True, mask=0, on_change=None):
         super().__init__()
 
         self.show_only = show_only
-        if markers:
-            self.markers = markers
-        else:
-            self.markers = {
-                "head": False,
-                "neck": False,
-                "left_arm_upper": False,
-                "left_arm_lower": False,
-                "left_palm": False,
-                "right_arm_upper": False,
-                "right_arm_lower": False,
-                "right_palm": False,
-                "torso": False,
-                "left_leg_upper": False,
-                "left_leg_lower": False,
-                "left_feet": False,
-                "right_leg_upper": False,
-                "right_leg_lower": False,
-                "right_feet": False,
-            }
+        self.mask = mask
+        self.on_change = on_change
 
         self.init_ui()
 
     def init_ui(self):
-        QtGui.QImageReader.setAllocationLimit(0)
-
         # Create a QGraphicsView and QGraphicsScene
         self.scene = QGraphicsScene()
         self.view = QGraphicsView(self.scene)
 
-        # Load an image using QPixmap
-        pixmap = QtGui.QPixmap("img/human_body.jpg")
-
-        pixmap = pixmap.scaled(300, 700)
-        pixmap_item = QGraphicsPixmapItem(pixmap)
+        pixmap_item = QGraphicsPixmapItem(body_pixmap())
         self.scene.addItem(pixmap_item)
 
-        self.btn_dict = {
-            "head": (QPushButton(), (135, 20), self.markers["head"]),
-            "neck": (QPushButton(), (135, 75), self.markers["neck"]),
-            "left_arm_upper": (
-                QPushButton(),
-                (50, 150),
-                self.markers["left_arm_upper"],
-            ),
-            "left_arm_lower": (
-                QPushButton(),
-                (35, 250),
-                self.markers["left_arm_lower"],
-            ),
-            "left_palm": (QPushButton(), (25, 350), self.markers["left_palm"]),
-            "right_arm_upper": (
-                QPushButton(),
-                (225, 150),
-                self.markers["right_arm_upper"],
-            ),
-            "right_arm_lower": (
-                QPushButton(),
-                (240, 250),
-                self.markers["right_arm_lower"],
-            ),
-            "right_palm": (QPushButton(), (250, 350), self.markers["right_palm"]),
-            "torso": (QPushButton(), (135, 200), self.markers["torso"]),
-            "left_leg_upper": (
-                QPushButton(),
-                (95, 400),
-                self.markers["left_leg_upper"],
-            ),
-            "left_leg_lower": (
-                QPushButton(),
-                (80, 550),
-                self.markers["left_leg_lower"],
-            ),
-            "left_feet": (QPushButton(), (45, 650), self.markers["left_feet"]),
-            "right_leg_upper": (
-                QPushButton(),
-                (185, 400),
-                self.markers["right_leg_upper"],
-            ),
-            "right_leg_lower": (
-                QPushButton(),
-                (200, 550),
-                self.markers["right_leg_lower"],
-            ),
-            "right_feet": (QPushButton(), (235, 650), self.markers["right_feet"]),
-        }
-
-        for btn_id, btn in self.btn_dict.items():
-            btn[0].setFixedSize(30, 30)
-            if self.btn_dict[btn_id][2]:
-                self.btn_dict[btn_id][0].setStyleSheet(
-                    "border : 2px solid #00008B; background-color: darkorange;"
-                )
-            else:
-                self.btn_dict[btn_id][0].setStyleSheet(
-                    "border : 2px solid #00008B; background-color: #00008B;"
-                )
+        self.btn_dict = {}
+        for bit, btn_id in enumerate(constants.body_parts):
+            btn = QPushButton()
+            btn.setFixedSize(30, 30)
+            self.btn_dict[btn_id] = btn
+            self.style_button(bit)
 
             if not self.show_only:
-                btn[0].clicked.connect(lambda _, bid=btn_id: self.button_clicked(bid))
-            btn_item = self.scene.addWidget(btn[0])
-            btn[0].setObjectName("btnBody")
-            btn_item.setPos(btn[1][0], btn[1][1])
+                btn.clicked.connect(lambda _, bid=btn_id: self.button_clicked(bid))
+            btn_item = self.scene.addWidget(btn)
+            btn.setObjectName("btnBody")
+            btn_item.setPos(*self.marker_positions[btn_id])
 
         # Create a QVBoxLayout for the main widget
         layout = QVBoxLayout()
@@ -450,33 +514,58 @@ class BodyImageView(QWidget):
         # Set the layout for the main widget
         self.setLayout(layout)
 
-    def button_clicked(self, btn_id):
-        self.mark_button(btn_id)
-
-    def mark_button(self, btn_id):
-        if not self.markers[btn_id]:
-            self.btn_dict[btn_id][0].setStyleSheet(
+    def style_button(self, bit):
+        btn = self.btn_dict[constants.body_parts[bit]]
+        if self.mask >> bit & 1:
+            btn.setStyleSheet(
                 "border : 2px solid #00008B; background-color: darkorange;"
             )
-            self.markers[btn_id] = True
         else:
-            self.btn_dict[btn_id][0].setStyleSheet(
+            btn.setStyleSheet(
                 "border : 2px solid #00008B; background-color: #00008B;"
             )
-            self.markers[btn_id] = False
+
+    def set_mask(self, mask):
+        """
+        Show another entry's markers, restyling only the buttons that change.
+        """
+        changed, self.mask = self.mask ^ mask, mask
+        for bit in range(len(constants.body_parts)):
+            if changed >> bit & 1:
+                self.style_button(bit)
+
+    def button_clicked(self, btn_id):
+        self.mark_button(btn_id)
+
+    def mark_button(self, btn_id):
+        bit = constants.body_parts.index(btn_id)
+        self.mask ^= 1 << bit
+        self.style_button(bit)
+
+        if self.on_change:
+            self.on_change(self.mask)
 
 
 class LogView(QWidget):
-    def __init__(self, user_data, tracker, button_callbacks={}):
+    def __init__(
+        self, user_data, tracker, button_callbacks={}, submissions=None, events=None
+    ):
         super(LogView, self).__init__()
         self.button_callbacks = button_callbacks
         self.init_ui()
         self.user_data = user_data
         self.current_date = tracker.today
-        self.current_log_items = {}
+        self.current_time = None
         self.tracker = tracker
+        self.submissions = (
+            submissions if submissions else SubmissionQueue(tracker, user_data)
+        )
+        self.dirty = False
 
         self.setup_callbacks()
+        if events:
+            events.entries_changed.connect(self.on_entries_changed)
+            events.history_changed.connect(self.on_history_changed)
 
         self.load_day_logs()
 
@@ -484,6 +573,10 @@ class LogView(QWidget):
         if "back" in self.button_callbacks:
             self.btnBack.clicked.connect(self.button_callbacks["back"])
 
+        self.btnCancelPending.clicked.connect(self.cancel_pending)
+        self.submissions.pending_changed.connect(self.on_pending_changed)
+        self.submissions.failed.connect(self.on_submit_failed)
+
     def init_ui(self):
         self.layout = QHBoxLayout()
         self.layout.setObjectName("layout")
@@ -553,14 +646,20 @@ class LogView(QWidget):
             headingsContainerFrame, QtCore.Qt.AlignmentFlag.AlignHCenter
         )
 
-        # Placeholder for log list
-        self.layoutLog = QVBoxLayout()
-        self.layoutLog.setAlignment(QtCore.Qt.AlignmentFlag.AlignTop)
-        self.layoutLog.setObjectName("layoutLog")
-        layoutLogWidget = QWidget()
-        layoutLogWidget.setLayout(self.layoutLog)
-        # layoutLogWidget.setFixedHeight(420)
-        self.layoutLeft.addWidget(layoutLogWidget)
+        # Log list, painted by the delegate one visible row at a time
+        self.logModel = LogListModel(self)
+        self.logList = QListView()
+        self.logList.setObjectName("logList")
+        self.logList.setModel(self.logModel)
+        self.logList.setItemDelegate(LogItemDelegate(self.logList))
+        self.logList.setUniformItemSizes(True)
+        self.logList.setMouseTracking(True)
+        self.logList.setFrameShape(QFrame.Shape.NoFrame)
+        self.logList.setVerticalScrollMode(QListView.ScrollMode.ScrollPerPixel)
+        self.logList.setSelectionMode(QListView.SelectionMode.SingleSelection)
+        self.logList.setFixedWidth(435)
+        self.logList.selectionModel().currentChanged.connect(self.on_current_changed)
+        self.layoutLeft.addWidget(self.logList)
 
         # Contain layout within widget and set max width
         layoutLeftWidget = QWidget()
@@ -568,6 +667,18 @@ class LogView(QWidget):
         layoutLeftWidget.setMaximumSize(QtCore.QSize(480, 16777215))
         self.layout.addWidget(layoutLeftWidget)
 
+        # Pending submissions / errors
+        self.layoutStatus = QHBoxLayout()
+        self.labelStatus = QLabel()
+        self.labelStatus.setObjectName("labelStatus")
+        self.layoutStatus.addWidget(self.labelStatus)
+        self.btnCancelPending = QPushButton("CANCEL")
+        self.btnCancelPending.setObjectName("btnCancelPending")
+        self.btnCancelPending.setFixedSize(100, 30)
+        self.btnCancelPending.hide()
+        self.layoutStatus.addWidget(self.btnCancelPending)
+        self.layoutLeft.addLayout(self.layoutStatus)
+
         self.btnAddLog = QPushButton("+")
         self.btnAddLog.setObjectName("btnAddLog")
         self.btnAddLog.setFixedSize(50, 50)
@@ -601,26 +712,21 @@ class LogView(QWidget):
 
         self.setLayout(self.layout)
 
-    def launchAddLogPopup(self):
-        pop = LogSunlight("hey", self)
-        pop.show()
-        ...
-
     def previous_date(self):
-        sorted_dates = self.tracker.sorted_days()
-        current_index = sorted_dates.index(self.current_date)
-        if current_index > 0:
-            self.current_date = sorted_dates[current_index - 1]
+        previous_day = self.tracker.previous_day(self.current_date)
+        if previous_day:
+            self.current_date = previous_day
             self.load_day_logs()
 
     def next_date(self):
-        sorted_dates = self.tracker.sorted_days()
-        current_index = sorted_dates.index(self.current_date)
-        if current_index < len(sorted_dates) - 1:
-            self.current_date = sorted_dates[current_index + 1]
+        next_day = self.tracker.next_day(self.current_date)
+        if next_day:
+            self.current_date = next_day
             self.load_day_logs()
 
     def load_day_logs(self):
+        self.dirty = False
+
         # make label show TODAY if today
         # hide add logs button if not today
         if self.current_date == self.tracker.today:
@@ -630,251 +736,128 @@ class LogView(QWidget):
             self.labelDay.setText(self.current_date)
             self.btnAddLog.hide()
 
-        # remove previous entries
-        self.current_log_items = {}
-        while self.layoutLog.count():
-            log_item = self.layoutLog.takeAt(0)
-            log_item_widget = log_item.widget()
-
-            if log_item_widget:
-                log_item_widget.deleteLater()
-
         # Set Daily total value on top
         self.txtDayValue.setText(
             str(self.tracker.daily_total(self.current_date)) + " IU"
         )
 
-        for timestamp in self.tracker.sorted_times(self.current_date):
-            self.add_log(
+        day_entries = self.tracker.day_entries(self.current_date)
+        sorted_times = self.tracker.sorted_times(self.current_date)
+        rows = [
+            (
                 timestamp,
-                self.tracker.entries[self.current_date][timestamp]["duration"],
-                self.tracker.entries[self.current_date][timestamp]["reading"],
-                self.tracker.entries[self.current_date][timestamp]["location"],
+                day_entries[timestamp]["duration"],
+                day_entries[timestamp]["reading"],
+                day_entries[timestamp]["location"],
+                False,
             )
+            for timestamp in sorted_times
+        ]
 
-        if self.tracker.entries[self.current_date]:
-            self.current_time = self.tracker.sorted_times(self.current_date)[0]
-            self.display_body_markers()
-            # add special indicators to new current time
-            self.current_log_items[self.current_time].setStyleSheet(
-                """
-                #logItem {
-                    border: 2px solid #00008B;
-                    background-color: #f8f8f8;
-                
-                }
-                """
-            )
-        else:
-            self.current_time = None
+        for timestamp in self.submissions.pending_entries(self.current_date):
+            if timestamp not in day_entries:
+                rows.append((timestamp, "-", "...", "fetching UV index", True))
+
+        self.current_time = None
+        self.logModel.set_rows(rows)
+        if sorted_times:
+            self.log_selection_callback(sorted_times[0])
 
     def display_body_markers(self):
-        newBodyImageView = BodyImageView(
-            markers=self.tracker.entries[self.current_date][self.current_time]["body"]
+        self.bodyImageView.set_mask(
+            body_to_mask(
+                self.tracker.get_entry(self.current_date, self.current_time)["body"]
+            )
         )
-        self.layoutRight.replaceWidget(self.bodyImageView, newBodyImageView)
-        self.bodyImageView.deleteLater()
-        self.bodyImageView = newBodyImageView
 
     def log_selection_callback(self, timestamp):
-        # remove special indicators from current time
-        self.current_log_items[self.current_time].setStyleSheet(
-            """
-            #logItem {
-                border: none;
-                border-bottom: 1px solid #c5c5c5;
-                background-color: transparent;
-            }
-            #logItem:hover {
-                border-bottom: 2px solid #00008B;
-                background-color: #f8f8f8;
-            }
-            """
-        )
+        row = self.logModel.row(timestamp)
+        if row is None or row[4]:
+            return
 
         self.current_time = timestamp
-
-        # add special indicators to new current time
-        self.current_log_items[self.current_time].setStyleSheet(
-            """
-            #logItem {
-                border: 2px solid #00008B;
-                background-color: #f8f8f8;
-            
-            }
-            """
-        )
+        index = self.logModel.index_of(timestamp)
+        if self.logList.currentIndex() != index:
+            self.logList.setCurrentIndex(index)
 
         self.display_body_markers()
 
-    def add_log(self, timestamp, time_duration, reading, location):
-        item = LogItem(
-            reading + " IU",
-            timestamp,
-            time_duration,
-            location,
-            self.log_selection_callback,
-        )
-        self.current_log_items[timestamp] = item
-        self.layoutLog.addWidget(item)
-
-    def launchAddLogPopup(self):
-        pop = LogSunlight("hey", self)
-        pop.show()
-
-
-class UVGraph(QWidget):
-    def __init__(self, title, parent=None):
-        super().__init__(parent)
-
-        self.view = QWidget()
-        self.view.setObjectName("graphWidget")
-
-        self.layout = QHBoxLayout()
-        self.view.setLayout(self.layout)
-
-        self.figure = Figure()
-        self.title = title
-        self.canvas = FigureCanvas(self.figure)
-        self.ax = self.figure.add_subplot(111)
-
-        self.layout.addWidget(self.canvas)
-
-        layout = QVBoxLayout()
-        layout.addWidget(self.view)
-        self.setLayout(layout)
-
-    def create_symmetric_distribution(self, peak):
-        fractions = [0.2, 0.5, 0.7, 0.9, 1, 0.9, 0.7, 0.5, 0.2]
-        return [fraction * peak for fraction in fractions]
+    def on_current_changed(self, current, _):
+        timestamp = current.data(QtCore.Qt.ItemDataRole.DisplayRole)
+        if timestamp is not None and timestamp != self.current_time:
+            self.log_selection_callback(timestamp)
 
-    def plot(self, peak):
-        hours = [str(i) + ":00" for i in range(8, 12)] + [
-            str(i) + ":00" for i in range(12, 17)
-        ]
-        uv_levels = self.create_symmetric_distribution(float(peak))
-
-        print("HRS", hours)
-        print("UV", uv_levels)
-        self.ax.clear()
-        self.ax.spines["bottom"].set_visible(False)
-        self.ax.spines["left"].set_visible(False)
-        self.ax.spines["top"].set_visible(False)
-        self.ax.spines["right"].set_visible(False)
-        self.ax.tick_params(axis="both", which="both", length=0)
-        self.ax.set_xticklabels(hours, rotation="vertical", fontsize="x-small")
-        self.ax.plot(
-            hours,
-            uv_levels,
-            color="darkorange",
-            marker="o",
-            linestyle="-",
-            linewidth=2,
-        )
-        self.ax.fill_between(hours, uv_levels, color="#e3e3e3", alpha=0.4)
-        self.ax.set_title(self.title)
-
-        self.canvas.draw()
-
-
-class UserLogGraph(QWidget):
-    def __init__(self, title, parent=None):
-        super().__init__(parent)
-
-        self.view = QWidget()
-        self.view.setObjectName("graphWidget")
-
-        self.layout = QHBoxLayout()
-        self.view.setLayout(self.layout)
-
-        self.figure = Figure()
-        self.title = title
-        self.canvas = FigureCanvas(self.figure)
-        self.ax = self.figure.add_subplot(111)
-
-        self.layout.addWidget(self.canvas)
-
-        layout = QVBoxLayout()
-        layout.addWidget(self.view)
-        self.setLayout(layout)
-
-    def plot(self, log_labels, log_readings, target=None, cumulative=True):
-        categories = log_labels
-        readings_bar = log_readings
-        cumulative_readings_line = list(accumulate(readings_bar))
-        if target:
-            target_line = [target] * len(readings_bar)
-
-        self.ax.clear()
-        self.ax.bar(categories, readings_bar, color="#00008B")
-        self.ax.spines["bottom"].set_visible(False)
-        self.ax.spines["left"].set_visible(False)
-        self.ax.spines["top"].set_visible(False)
-        self.ax.spines["right"].set_visible(False)
-        self.ax.tick_params(axis="both", which="both", length=0)
-        self.ax.set_xticklabels(categories, rotation="vertical", fontsize="x-small")
-        if cumulative:
-            self.ax.plot(
-                categories,
-                cumulative_readings_line,
-                color="darkorange",
-                marker="o",
-                linestyle="--",
-                linewidth=2,
-            )
-        if target:
-            self.ax.plot(categories, target_line, color="black")
-        self.ax.set_title(self.title)
-
-        self.canvas.draw()
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.dirty:
+            self.load_day_logs()
 
+    def on_entries_changed(self, day):
+        if day == self.current_date:
+            self.reload_later()
 
-class SensorGraph(QWidget):
-    def __init__(self, title, parent=None):
-        super().__init__(parent)
+    def on_history_changed(self):
+        self.reload_later()
 
-        self.view = QWidget()
-        self.view.setObjectName("graphWidget")
+    def reload_later(self):
+        if self.isVisible():
+            self.load_day_logs()
+        else:
+            self.dirty = True
 
-        self.layout = QHBoxLayout()
-        self.view.setLayout(self.layout)
+    def submit_entry(self, log_data, location_text):
+        self.labelStatus.setText("")
+        self.submissions.submit(log_data, location_text)
 
-        self.figure = Figure()
-        self.title = title
-        self.canvas = FigureCanvas(self.figure)
-        self.ax = self.figure.add_subplot(111)
+    def cancel_pending(self):
+        self.submissions.cancel()
 
-        self.layout.addWidget(self.canvas)
+    def on_pending_changed(self):
+        pending = self.submissions.pending_entries(self.tracker.today)
+        if pending:
+            self.labelStatus.setText(f"Saving {', '.join(pending)}...")
+            self.btnCancelPending.show()
+        else:
+            self.labelStatus.setText("")
+            self.btnCancelPending.hide()
 
-        layout = QVBoxLayout()
-        layout.addWidget(self.view)
-        self.setLayout(layout)
+        if self.current_date == self.tracker.today:
+            self.load_day_logs()
 
-    def plot(self, x, y):
-        self.ax.clear()
-        self.ax.spines["bottom"].set_visible(False)
-        self.ax.spines["left"].set_visible(False)
-        self.ax.spines["top"].set_visible(False)
-        self.ax.spines["right"].set_visible(False)
-        self.ax.tick_params(axis="both", which="both", length=0)
-        self.ax.set_xticklabels(x, rotation="vertical", fontsize="x-small")
-        self.ax.plot(
-            x,
-            y,
-            color="darkorange",
-            linestyle="-",
-            linewidth=1,
-        )
-        self.ax.set_title(self.title)
+    def on_submit_failed(self, message):
+        self.labelStatus.setText(message)
 
-        self.canvas.draw()
+    def launchAddLogPopup(self):
+        pop = LogSunlight("hey", self)
+        pop.show()
 
 
 class SensorView(QWidget):
-    def __init__(self, button_callbacks={}):
+    # seconds of samples shown and the shortest time between two redraws (ms)
+    window_seconds = 30
+    redraw_interval = 200
+
+    def __init__(self, button_callbacks={}, sensor=None, sessions=None, archive=None):
         super().__init__()
 
         self.button_callbacks = button_callbacks
+        self.sensor = sensor
+        self.sessions = sessions
+        self.archive = archive
+        # ring buffer position the chart has caught up to
+        self.cursor = 0
+        self.rate = 0
+        self.rate_mark = (0, 0)
+
+        # live session counter
+        self.live_timer = QtCore.QTimer(self)
+        self.live_timer.setInterval(1000)
+        self.live_timer.timeout.connect(self.update_live)
+
+        self.redraw_timer = QtCore.QTimer(self)
+        self.redraw_timer.setSingleShot(True)
+        self.redraw_timer.setInterval(self.redraw_interval)
+        self.redraw_timer.timeout.connect(self.redraw)
 
         self.init_ui()
         self.setup_callbacks()
@@ -885,7 +868,12 @@ class SensorView(QWidget):
         self.mainLayout.setAlignment(QtCore.Qt.AlignmentFlag.AlignTop)
         self.mainLayout.setContentsMargins(20, 20, 20, 20)
 
-        self.sensor_graph = SensorGraph("BH1750 Light sensor (Lux)")
+        # matplotlib is only loaded once a view with a chart is built
+        import charts
+
+        self.sensor_graph = charts.SensorGraph(
+            "BH1750 Light sensor (Lux)", self.archive.query if self.archive else None
+        )
         self.mainLayout.addWidget(self.sensor_graph)
 
         self.btnBack = QPushButton("BACK")
@@ -894,8 +882,20 @@ class SensorView(QWidget):
         self.sensor_message = QLabel()
         self.sensor_message.setObjectName("sensorMessage")
 
+        # live session: running Vitamin D estimate and start / end button
+        self.layoutSession = QHBoxLayout()
+        self.labelLive = QLabel()
+        self.labelLive.setObjectName("sensorView__labelLive")
+        self.layoutSession.addWidget(self.labelLive)
+        self.layoutSession.addItem(SPACING_EX(20))
+        self.btnSession = QPushButton("START SESSION")
+        self.btnSession.setObjectName("sensorView__btnSession")
+        self.btnSession.setFixedSize(160, 40)
+        self.layoutSession.addWidget(self.btnSession)
+
         self.mainLayout.addWidget(self.sensor_graph)
         self.mainLayout.addWidget(self.sensor_message)
+        self.mainLayout.addLayout(self.layoutSession)
         self.mainLayout.addItem(SPACING_EX(20, "v"))
         self.mainLayout.addWidget(self.btnBack)
 
@@ -903,16 +903,104 @@ class SensorView(QWidget):
         if "back" in self.button_callbacks:
             self.btnBack.clicked.connect(self.button_callbacks["back"])
 
+        if self.sensor:
+            self.sensor.updated.connect(self.on_samples)
+            self.sensor_graph.resumed.connect(self.redraw)
+            self.sensor.failed.connect(self.sensor_message.setText)
+        else:
+            self.sensor_message.setText("No light sensor configured")
+
+        if self.sessions:
+            self.btnSession.clicked.connect(self.toggle_session)
+            self.sessions.started.connect(self.on_session_started)
+            self.sessions.stopped.connect(self.on_session_stopped)
+        else:
+            self.btnSession.hide()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.sensor:
+            self.redraw()
+        if self.sessions and self.sessions.session:
+            self.on_session_started()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.live_timer.stop()
+
+    def toggle_session(self):
+        if self.sessions.session:
+            self.sessions.stop()
+        else:
+            pop = LiveSessionSetup(self.sessions, self)
+            pop.show()
+
+    def on_session_started(self):
+        self.btnSession.setText("END SESSION")
+        self.update_live()
+        self.live_timer.start()
+
+    def on_session_stopped(self, message):
+        self.btnSession.setText("START SESSION")
+        self.live_timer.stop()
+        self.labelLive.setText(message)
+
+    def update_live(self):
+        session = self.sessions.session
+        if session:
+            minutes, seconds = divmod(int(session.duration), 60)
+            self.labelLive.setText(
+                f"LIVE: {session.vitamin_d()} IU in {minutes}:{seconds:02d}"
+            )
+
+    def on_samples(self):
+        # samples arriving while a redraw is due are picked up by it
+        if self.isVisible() and not self.redraw_timer.isActive():
+            self.redraw_timer.start()
+
+    def redraw(self):
+        graph = self.sensor_graph
+        if graph.stale(self.window_seconds):
+            # columns changed width: start over from what the buffer holds
+            graph.reset(self.window_seconds)
+            self.cursor = 0
+        times, lux, self.cursor = self.sensor.buffer.since(self.cursor)
+        if not len(times):
+            return
+        graph.append(times, lux)
+
+        now = time.monotonic()
+        cursor, since = self.rate_mark
+        if now - since >= 1:
+            self.rate = (self.cursor - cursor) / (now - since) if since else 0
+            self.rate_mark = (self.cursor, now)
+        self.sensor_message.setText(f"{lux[-1]:.0f} lux, {self.rate:.0f} samples/s")
+
 
 class MainView(QWidget):
-    def __init__(self, user_data, tracker, button_callbacks={}):
+    # charts are built and drawn for the first time
+    ready = QtCore.pyqtSignal()
+
+    def __init__(
+        self, user_data, tracker, button_callbacks={}, events=None, forecasts=None
+    ):
         super(MainView, self).__init__()
         self.user_data = user_data
         self.button_callbacks = button_callbacks
         self.tracker = tracker
+        self.forecasts = forecasts if forecasts else ForecastRefresh(tracker)
+        self.showing_forecast = False
+        self.dirty = {"forecast", "today", "weekly"}
+        self.shown_settings = None
+        self.charts_built = False
+        self.charts_pending = False
         self.init_ui()
 
         self.setup_callbacks()
+        if events:
+            events.entries_changed.connect(self.on_entries_changed)
+            events.history_changed.connect(self.on_history_changed)
+            events.settings_changed.connect(self.on_settings_changed)
 
     def setup_callbacks(self):
         if "settings" in self.button_callbacks:
@@ -922,6 +1010,9 @@ class MainView(QWidget):
         if "sensor" in self.button_callbacks:
             self.btnSensor.clicked.connect(self.button_callbacks["sensor"])
 
+        self.forecasts.updated.connect(self.on_forecast_updated)
+        self.forecasts.failed.connect(self.on_forecast_failed)
+
     def init_ui(self):
         self.mainLayout = QVBoxLayout()
         self.mainLayout.setObjectName("mainLayout")
@@ -935,27 +1026,28 @@ class MainView(QWidget):
             self.txtToday, 0, QtCore.Qt.AlignmentFlag.AlignHCenter
         )
 
-        self.todayContainer = QHBoxLayout()
+        # forecast refresh / offline notice
+        self.labelForecastStatus = QLabel()
+        self.labelForecastStatus.setObjectName("mainView__labelForecastStatus")
+        self.mainLayout.addWidget(
+            self.labelForecastStatus, 0, QtCore.Qt.AlignmentFlag.AlignHCenter
+        )
 
-        uvi_max = self.tracker.get_uvi_from_openmeteo(
-            self.user_data.data["location"][1]
-        )[1]
+        self.todayContainer = QHBoxLayout()
 
         self.todayValueTarget = QHBoxLayout()
         self.todayValueTarget.setAlignment(QtCore.Qt.AlignmentFlag.AlignHCenter)
 
         self.txtTodayValueLabel = QLabel("CURRENT:")
         self.txtTodayValueLabel.setObjectName("mainView__txtTodayValueLabel")
-        self.txtTodayValue = QLabel(
-            str(self.tracker.daily_total(self.tracker.today)) + " IU"
-        )
+        self.txtTodayValue = QLabel()
         self.txtTodayValue.setObjectName("mainView__txtTodayValue")
 
         self.txtTodayTargetValueLabel = QLabel("TARGET:")
         self.txtTodayTargetValueLabel.setObjectName(
             "mainView__txtTodayTargetValueLabel"
         )
-        self.txtTodayTargetValue = QLabel(str(self.user_data.data["target"]) + " IU")
+        self.txtTodayTargetValue = QLabel()
         self.txtTodayTargetValue.setObjectName("mainView__txtTodayTargetValue")
 
         self.todayValueTarget.addWidget(
@@ -974,17 +1066,9 @@ class MainView(QWidget):
             self.txtTodayTargetValue, 0, QtCore.Qt.AlignmentFlag.AlignHCenter
         )
 
-        self.todaySunlightPlot = UVGraph("UVI Today")
-        self.todaySunlightPlot.plot(uvi_max[0])
-        self.todayLogPlot = UserLogGraph("Exposure Today")
-        self.todayLogPlot.plot(
-            self.tracker.entries[self.tracker.today].keys(),
-            [
-                int(val["reading"])
-                for val in self.tracker.entries[self.tracker.today].values()
-            ],
-            self.user_data.data["target"],
-        )
+        # empty frames until build_charts() swaps the charts in
+        self.todaySunlightPlot = self.chart_placeholder()
+        self.todayLogPlot = self.chart_placeholder()
 
         self.todayContainer.addWidget(self.todaySunlightPlot)
         self.todayContainer.addWidget(self.todayLogPlot)
@@ -1001,30 +1085,11 @@ class MainView(QWidget):
 
         self.weeklyContainer = QHBoxLayout()
 
-        self.last_7_day_labels = self.tracker.get_last_7()
-        self.last_7_day_values = [
-            self.tracker.daily_total(day) for day in self.last_7_day_labels
-        ]
-
         self.txtWeeklyValue = QLabel("0000")
         self.txtWeeklyValue.setObjectName("mainView__txtWeeklyValue")
 
-        self.weeklySunlightPlot = UserLogGraph("UVI Next 7 days")
-        next_7_days = [datetime.now() + timedelta(days=i) for i in range(7)]
-        next_7_days = [date.strftime("%d/%m") for date in next_7_days]
-        self.weeklySunlightPlot.plot(
-            next_7_days, uvi_max, target=None, cumulative=False
-        )
-        self.weeklyLogPlot = UserLogGraph("Exposure Last 7 days")
-        self.weeklyLogPlot.plot(
-            [
-                label.replace("-2023", "").replace("-", "/")
-                for label in self.last_7_day_labels
-            ],
-            self.last_7_day_values,
-            self.user_data.data["target"],
-            cumulative=False,
-        )
+        self.weeklySunlightPlot = self.chart_placeholder()
+        self.weeklyLogPlot = self.chart_placeholder()
 
         self.weeklyContainer.addWidget(self.weeklySunlightPlot)
         self.weeklyContainer.addWidget(self.weeklyLogPlot)
@@ -1054,41 +1119,284 @@ class MainView(QWidget):
 
         self.setLayout(self.mainLayout)
 
+    def chart_placeholder(self):
+        view = QWidget()
+        view.setObjectName("graphWidget")
+        placeholder = QWidget()
+        layout = QVBoxLayout(placeholder)
+        layout.addWidget(view)
+        return placeholder
+
+    def build_charts(self):
+        import charts
+
+        for name, chart in (
+            ("todaySunlightPlot", charts.UVGraph("UVI Today")),
+            ("todayLogPlot", charts.UserLogGraph("Exposure Today")),
+            ("weeklySunlightPlot", charts.UserLogGraph("UVI Next 7 days")),
+            ("weeklyLogPlot", charts.UserLogGraph("Exposure Last 7 days")),
+        ):
+            placeholder = getattr(self, name)
+            self.mainLayout.replaceWidget(placeholder, chart)
+            placeholder.deleteLater()
+            setattr(self, name, chart)
+
+        self.charts_built = True
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.charts_built:
+            self.refresh()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        # let the first frame out before loading matplotlib and the data
+        if not self.charts_built and not self.charts_pending:
+            self.charts_pending = True
+            QtCore.QTimer.singleShot(0, self.finish_first_paint)
+
+    def finish_first_paint(self):
+        self.build_charts()
+        self.refresh()
+        self.ready.emit()
+
+    def refresh(self):
+        """
+        Redraw only the parts whose inputs changed since the last refresh.
+        """
+        dirty, self.dirty = self.dirty, set()
+        self.shown_settings = (
+            self.user_data.data["target"],
+            self.user_data.data["location"],
+        )
+
+        if "forecast" in dirty:
+            self.refresh_forecast()
+        if "today" in dirty:
+            self.refresh_today()
+        if "weekly" in dirty:
+            self.refresh_weekly()
+
+    def refresh_later(self, *parts):
+        self.dirty.update(parts)
+        if self.isVisible() and self.charts_built:
+            self.refresh()
+
+    def on_entries_changed(self, day):
+        parts = []
+        if day == self.tracker.today:
+            parts.append("today")
+        if day in self.tracker.get_last_7():
+            parts.append("weekly")
+        self.refresh_later(*parts)
+
+    def on_history_changed(self):
+        self.refresh_later("today", "weekly")
+
+    def on_settings_changed(self):
+        target, location = self.shown_settings
+        parts = []
+        if location != self.user_data.data["location"]:
+            parts.append("forecast")
+        if target != self.user_data.data["target"]:
+            parts.extend(["today", "weekly"])
+        self.refresh_later(*parts)
+
+    def refresh_forecast(self):
+        """
+        Show the saved forecast straight away and fetch a new one in the
+        background unless the saved one is still fresh.
+        """
+        gps_coordinates = self.user_data.data["location"][1]
+        value, fresh = self.tracker.get_saved_uvi(gps_coordinates)
+
+        self.showing_forecast = value is not None
+        if value is not None:
+            self.show_forecast(value)
+        if fresh:
+            self.labelForecastStatus.setText("")
+        else:
+            self.labelForecastStatus.setText("Refreshing UV forecast...")
+            self.forecasts.fetch(gps_coordinates)
+
+    def on_forecast_updated(self, gps_coordinates, value):
+        if list(gps_coordinates) != list(self.user_data.data["location"][1]):
+            return
+
+        self.showing_forecast = True
+        self.labelForecastStatus.setText("")
+        if self.charts_built:
+            self.show_forecast(value)
+        else:
+            self.dirty.add("forecast")
+
+    def on_forecast_failed(self, gps_coordinates, _):
+        if list(gps_coordinates) != list(self.user_data.data["location"][1]):
+            return
+
+        if self.showing_forecast:
+            self.labelForecastStatus.setText("Offline, showing the last UV forecast")
+        else:
+            self.labelForecastStatus.setText("UV forecast unavailable")
+
+    def show_forecast(self, value):
+        uvi_max = value[1]
+
+        self.todaySunlightPlot.plot(uvi_max[0], self.user_data.data["location"][1])
+
+        next_7_days = [datetime.now() + timedelta(days=i) for i in range(len(uvi_max))]
+        next_7_days = [date.strftime("%d/%m") for date in next_7_days]
+        self.weeklySunlightPlot.plot(
+            next_7_days, uvi_max, target=None, cumulative=False
+        )
+
+    def refresh_today(self):
+        self.txtTodayValue.setText(
+            str(self.tracker.daily_total(self.tracker.today)) + " IU"
+        )
+        self.txtTodayTargetValue.setText(str(self.user_data.data["target"]) + " IU")
+
+        today_entries = self.tracker.day_entries(self.tracker.today)
+        labels = list(today_entries.keys())
+        readings = [int(val["reading"]) for val in today_entries.values()]
+        target = self.user_data.data["target"]
+
+        # a new latest entry only needs one more bar
+        chart = self.todayLogPlot
+        if (
+            labels
+            and chart.labels == labels[:-1]
+            and chart.readings == readings[:-1]
+            and chart.target == target
+        ):
+            chart.append(labels[-1], readings[-1])
+        else:
+            chart.plot(labels, readings, target)
+
+    def refresh_weekly(self):
+        self.last_7_day_labels = self.tracker.get_last_7()
+        self.last_7_day_values = [
+            self.tracker.daily_total(day) for day in self.last_7_day_labels
+        ]
+
+        self.weeklyLogPlot.plot(
+            [
+                label.replace("-2023", "").replace("-", "/")
+                for label in self.last_7_day_labels
+            ],
+            self.last_7_day_values,
+            self.user_data.data["target"],
+            cumulative=False,
+        )
+
+
+class DataEvents(QtCore.QObject):
+    """
+    Data-change notifications that cached views subscribe to.
+    """
+
+    entries_changed = QtCore.pyqtSignal(str)
+    history_changed = QtCore.pyqtSignal()
+    settings_changed = QtCore.pyqtSignal()
+
+
+@lru_cache(maxsize=None)
+def load_stylesheet():
+    with open("styles.css", "r") as file:
+        return file.read()
+
 
 class MainWindow(QMainWindow):
-    def __init__(self, user_data, tracker, button_callbacks):
+    # views kept alive at once, least recently shown are dropped first
+    max_views = 3
+
+    def __init__(self, user_data, tracker, button_callbacks, sensor=None, archive=None):
         super().__init__()
         self.setWindowTitle("Dsure - Track Vitamin D")
         self.setFixedSize(1000, 950)
         self.user_data = user_data
         self.tracker = tracker
         self.button_callbacks = button_callbacks
+        self.sensor = sensor
+        self.archive = archive
+        self.sessions = SessionRecorder(tracker, user_data, sensor) if sensor else None
+        self.sensor_view = None
 
-        with open("styles.css", "r") as file:
-            style_sheet = file.read()
-            self.setStyleSheet(style_sheet)
+        self.events = DataEvents()
+        self.submissions = SubmissionQueue(tracker, user_data)
+        self.submissions.saved.connect(self.on_entry_saved)
+        self.recompute = RecomputeJob(tracker)
+        self.recompute.updated.connect(self.events.history_changed)
+        self.recompute.resume()
+        self.forecasts = ForecastRefresh(tracker)
+        self.sync = EntrySync(tracker) if constants.dynamodb_sync else None
+        if self.sync:
+            self.sync.pulled.connect(self.events.history_changed)
+            self.sync.start()
+        if self.sessions:
+            self.sessions.saved.connect(self.on_entry_saved)
+
+        self.setStyleSheet(load_stylesheet())
+
+        self.stack = QStackedWidget()
+        self.setCentralWidget(self.stack)
+        self.views = OrderedDict()
+        self.view_factories = {
+            "settings": lambda: SettingsView(
+                self.user_data,
+                self.tracker,
+                self.button_callbacks,
+                self.recompute,
+                self.events,
+            ),
+            "main": lambda: MainView(
+                self.user_data,
+                self.tracker,
+                self.button_callbacks,
+                self.events,
+                self.forecasts,
+            ),
+            "log": lambda: LogView(
+                self.user_data,
+                self.tracker,
+                self.button_callbacks,
+                self.submissions,
+                self.events,
+            ),
+            "sensor": lambda: SensorView(
+                self.button_callbacks, self.sensor, self.sessions, self.archive
+            ),
+        }
 
         if self.user_data.data:
             self.change_view("main")
         else:
             self.change_view("settings")
 
+    def on_entry_saved(self, day, time):
+        self.events.entries_changed.emit(day)
+
     def change_view(self, key):
-        self.sensor_view = None
-        if key == "settings":
-            settings_view = SettingsView(
-                self.user_data, self.tracker, self.button_callbacks
-            )
-            self.setCentralWidget(settings_view)
-        elif key == "main":
-            main_view = MainView(self.user_data, self.tracker, self.button_callbacks)
-            self.setCentralWidget(main_view)
-        elif key == "log":
-            log_view = LogView(self.user_data, self.tracker, self.button_callbacks)
-            self.setCentralWidget(log_view)
-        elif key == "sensor":
-            self.sensor_view = SensorView(self.button_callbacks)
-            self.setCentralWidget(self.sensor_view)
+        view = self.views.pop(key, None)
+        if view is None:
+            view = self.view_factories[key]()
+            self.stack.addWidget(view)
+        self.views[key] = view
+
+        if key == "sensor":
+            self.sensor_view = view
+
+        self.stack.setCurrentWidget(view)
+        self.evict_views()
+
+    def evict_views(self):
+        while len(self.views) > self.max_views:
+            key, view = next(iter(self.views.items()))
+            del self.views[key]
+            self.stack.removeWidget(view)
+            view.deleteLater()
+            if key == "sensor":
+                self.sensor_view = None
 
 
 class LogSunlight(QMainWindow):
@@ -1098,9 +1406,7 @@ class LogSunlight(QMainWindow):
         self.setFixedSize(600, 1000)
         self.setWindowTitle("Log Sunlight time")
 
-        with open("styles.css", "r") as file:
-            style_sheet = file.read()
-            self.setStyleSheet(style_sheet)
+        self.setStyleSheet(load_stylesheet())
 
         self.layout = QVBoxLayout()
         self.layout.setContentsMargins(40, 20, 40, 20)
@@ -1128,9 +1434,18 @@ class LogSunlight(QMainWindow):
         self.inputLocation.setFixedHeight(30)
         self.layout.addWidget(self.inputLocation)
 
-        self.bodyImageView = BodyImageView(show_only=False)
+        self.bodyImageView = BodyImageView(
+            show_only=False, on_change=self.update_exposure
+        )
         self.layout.addWidget(self.bodyImageView)
 
+        self.labelExposure = QLabel()
+        self.labelExposure.setObjectName("labelExposure")
+        self.layout.addWidget(
+            self.labelExposure, 0, QtCore.Qt.AlignmentFlag.AlignHCenter
+        )
+        self.update_exposure(self.bodyImageView.mask)
+
         self.buttonLayouts = QHBoxLayout()
         self.buttonCancelLogEntry = QPushButton("CANCEL")
         self.buttonCancelLogEntry.setObjectName("buttonCancelLogEntry")
@@ -1151,32 +1466,72 @@ class LogSunlight(QMainWindow):
         layout_widget.setLayout(self.layout)
         self.setCentralWidget(layout_widget)
 
+    def update_exposure(self, mask):
+        bsa = self.parent.tracker.compute_bsa(mask, self.parent.user_data.data["age"])
+        self.labelExposure.setText(f"EXPOSED: {bsa * 100:g}% OF BODY")
+
     def cancelLogEntry(self):
         self.close()
 
     def submitLogEntry(self):
-        # fetch body markers
-        # add and fetch location
-        gps_location = self.inputLocation.text()
-        gps_coordinates = (
-            self.parent.tracker.convert_text_to_gps(gps_location)
-            if gps_location
-            else ""
-        )
-        if not gps_coordinates:
-            gps_coordinates = (
-                self.parent.user_data.data["location"][0],
-                self.parent.user_data.data["location"][1],
-            )
-        else:
-            gps_coordinates = (gps_location, gps_coordinates)
-
+        # location is geocoded by the submission worker
         log_data = {
             "start_time": f"{self.inputStartTime.time().hour():02d}:{self.inputStartTime.time().minute():02d}",
             "end_time": f"{self.inputEndTime.time().hour():02d}:{self.inputEndTime.time().minute():02d}",
-            "location": gps_coordinates,
-            "body": self.bodyImageView.markers,
+            "body": self.bodyImageView.mask,
         }
-        self.parent.tracker.process_entry(log_data, self.parent.user_data)
-        self.parent.load_day_logs()
+        self.parent.submit_entry(log_data, self.inputLocation.text())
+        self.close()
+
+
+class LiveSessionSetup(QMainWindow):
+    def __init__(self, sessions, parent):
+        super().__init__(parent)
+        self.sessions = sessions
+        self.setFixedSize(600, 900)
+        self.setWindowTitle("Start live session")
+
+        self.setStyleSheet(load_stylesheet())
+
+        self.layout = QVBoxLayout()
+        self.layout.setContentsMargins(40, 20, 40, 20)
+
+        self.bodyImageView = BodyImageView(
+            show_only=False, on_change=self.update_exposure
+        )
+        self.layout.addWidget(self.bodyImageView)
+
+        self.labelExposure = QLabel()
+        self.labelExposure.setObjectName("labelExposure")
+        self.layout.addWidget(
+            self.labelExposure, 0, QtCore.Qt.AlignmentFlag.AlignHCenter
+        )
+        self.update_exposure(self.bodyImageView.mask)
+
+        self.buttonLayouts = QHBoxLayout()
+        self.buttonCancel = QPushButton("CANCEL")
+        self.buttonCancel.setFixedHeight(40)
+        self.buttonCancel.clicked.connect(self.close)
+
+        self.buttonStart = QPushButton("START")
+        self.buttonStart.setFixedHeight(40)
+        self.buttonStart.clicked.connect(self.start)
+
+        self.buttonLayouts.addWidget(self.buttonCancel)
+        self.buttonLayouts.addWidget(self.buttonStart)
+
+        self.layout.addLayout(self.buttonLayouts)
+
+        layout_widget = QWidget()
+        layout_widget.setLayout(self.layout)
+        self.setCentralWidget(layout_widget)
+
+    def update_exposure(self, mask):
+        bsa = self.sessions.tracker.compute_bsa(
+            mask, self.sessions.user_data.data["age"]
+        )
+        self.labelExposure.setText(f"EXPOSED: {bsa * 100:g}% OF BODY")
+
+    def start(self):
+        self.sessions.start(self.bodyImageView.mask)
         self.close()
@@ -0,0 +1,523 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+import calculator
+import constants
+from data import day_ordinal
+from storage import write_atomic
+from sync import BATCH_SIZE, DynamoRemote
+
+
+class TaskSignals(QObject):
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(object, str)
+
+
+class Task(QRunnable):
+    """
+    Runs work() on a pool thread. The result comes back through
+    signals.finished, or the error message through signals.failed, both
+    with the task itself first.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # owners keep tasks around to match results and cancel them
+        self.setAutoDelete(False)
+        self.signals = TaskSignals()
+
+    def run(self):
+        try:
+            result = self.work()
+        except Exception as error:
+            traceback.print_exc()
+            self.signals.failed.emit(self, str(error))
+        else:
+            self.signals.finished.emit(self, result)
+
+    def work(self):
+        raise NotImplementedError
+
+
+class SubmitTask(Task):
+    """
+    Geocodes, fetches UV and computes a log entry on a pool thread.
+    The result is the entry for add_entry(); nothing is saved here.
+    """
+
+    def __init__(self, tracker, user_data, log_data, location_text):
+        super().__init__()
+        self.tracker = tracker
+        self.user_data = user_data
+        self.log_data = log_data
+        self.location_text = location_text
+        self.key = (tracker.today, log_data["start_time"])
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def work(self):
+        gps_coordinates = (
+            self.tracker.convert_text_to_gps(self.location_text)
+            if self.location_text
+            else None
+        )
+        if self.cancelled.is_set():
+            # SubmissionQueue drops results of cancelled tasks
+            return None
+
+        if gps_coordinates:
+            self.log_data["location"] = (self.location_text, gps_coordinates)
+        else:
+            self.log_data["location"] = (
+                self.user_data.data["location"][0],
+                self.user_data.data["location"][1],
+            )
+
+        return self.tracker.prepare_entry(self.log_data, self.user_data)
+
+
+class SubmissionQueue(QObject):
+    """
+    Runs log submissions off the GUI thread and saves finished entries on
+    it. Views subscribe to the signals to show pending rows and errors.
+    """
+
+    pending_changed = pyqtSignal()
+    saved = pyqtSignal(str, str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, tracker, user_data, pool=None):
+        super().__init__()
+        self.tracker = tracker
+        self.user_data = user_data
+        self.pool = pool if pool else QThreadPool.globalInstance()
+        self.pending = {}
+
+    def submit(self, log_data, location_text):
+        task = SubmitTask(self.tracker, self.user_data, log_data, location_text)
+        task.signals.finished.connect(self.on_finished)
+        task.signals.failed.connect(self.on_failed)
+
+        if task.key in self.pending:
+            self.pending[task.key].cancel()
+        self.pending[task.key] = task
+        self.pool.start(task)
+        self.pending_changed.emit()
+
+    def cancel(self, key=None):
+        keys = [key] if key else list(self.pending)
+        for key in keys:
+            task = self.pending.pop(key, None)
+            if task:
+                task.cancel()
+        self.pending_changed.emit()
+
+    def pending_entries(self, day):
+        return sorted(
+            start_time for pending_day, start_time in self.pending if pending_day == day
+        )
+
+    def on_finished(self, task, result):
+        if task.cancelled.is_set() or self.pending.get(task.key) is not task:
+            return
+
+        del self.pending[task.key]
+        self.tracker.add_entry(*result)
+        self.pending_changed.emit()
+        self.saved.emit(*task.key)
+
+    def on_failed(self, task, message):
+        if self.pending.get(task.key) is not task:
+            return
+
+        del self.pending[task.key]
+        self.pending_changed.emit()
+        self.failed.emit(f"Could not log {task.key[1]}: {message}")
+
+
+class ForecastTask(Task):
+    """
+    Fetches the UV forecast for one location on a pool thread.
+    """
+
+    def __init__(self, tracker, gps_coordinates):
+        super().__init__()
+        self.tracker = tracker
+        self.gps_coordinates = gps_coordinates
+
+    def work(self):
+        return self.tracker.get_uvi_from_openmeteo(self.gps_coordinates)
+
+
+class ForecastRefresh(QObject):
+    """
+    Revalidates UV forecasts in the background, one fetch per location at
+    a time. Views keep showing the saved forecast until updated fires.
+    """
+
+    updated = pyqtSignal(object, object)
+    failed = pyqtSignal(object, str)
+
+    def __init__(self, tracker, pool=None):
+        super().__init__()
+        self.tracker = tracker
+        self.pool = pool if pool else QThreadPool.globalInstance()
+        self.pending = {}
+
+    def fetch(self, gps_coordinates):
+        key = tuple(gps_coordinates)
+        if key in self.pending:
+            return
+
+        task = ForecastTask(self.tracker, gps_coordinates)
+        task.signals.finished.connect(self.on_finished)
+        task.signals.failed.connect(self.on_failed)
+        self.pending[key] = task
+        self.pool.start(task)
+
+    def on_finished(self, task, value):
+        self.pending.pop(tuple(task.gps_coordinates), None)
+        self.updated.emit(task.gps_coordinates, value)
+
+    def on_failed(self, task, message):
+        self.pending.pop(tuple(task.gps_coordinates), None)
+        self.failed.emit(task.gps_coordinates, message)
+
+
+class RecomputeTask(Task):
+    """
+    Recomputes one chunk of entries for new settings on a pool thread.
+    """
+
+    def __init__(self, items, state):
+        super().__init__()
+        self.items = items
+        self.state = state
+
+    def work(self):
+        return calculator.recompute_entries(
+            self.items,
+            self.state["skin_type"],
+            self.state["age"],
+            self.state["legacy_skin_type"],
+            self.state["legacy_age"],
+        )
+
+
+class RecomputeJob(QObject):
+    """
+    Brings stored readings in line with the current skin type and age.
+
+    History is processed newest first in chunks on the thread pool, and
+    results are saved on the GUI thread. Progress is kept in
+    recompute.json so an interrupted job resumes on the next start.
+    """
+
+    updated = pyqtSignal()
+    finished = pyqtSignal()
+
+    def __init__(
+        self, tracker, state_path="recompute.json", chunk_size=500, pool=None
+    ):
+        super().__init__()
+        self.tracker = tracker
+        self.state_path = state_path
+        self.chunk_size = chunk_size
+        self.pool = pool if pool else QThreadPool.globalInstance()
+        self.state = None
+        self.keys = []
+        self.task = None
+
+    def start(self, previous, current):
+        if (previous["skin_type"], previous["age"]) == (
+            current["skin_type"],
+            current["age"],
+        ):
+            return
+
+        state = self.load_state()
+        self.state = {
+            "skin_type": current["skin_type"],
+            "age": current["age"],
+            # entries without recorded inputs still use the oldest settings
+            "legacy_skin_type": (
+                state["legacy_skin_type"] if state else previous["skin_type"]
+            ),
+            "legacy_age": state["legacy_age"] if state else previous["age"],
+            "cursor": None,
+        }
+        self.save_state()
+        self.schedule()
+
+    def resume(self):
+        self.state = self.load_state()
+        if self.state:
+            self.schedule()
+
+    def schedule(self):
+        self.keys = [
+            (day, time)
+            for day in reversed(self.tracker.sorted_days())
+            for time in reversed(self.tracker.sorted_times(day))
+        ]
+        if self.state["cursor"]:
+            cursor = self.sort_key(self.state["cursor"])
+            self.keys = [key for key in self.keys if self.sort_key(key) < cursor]
+
+        self.next_chunk()
+
+    @staticmethod
+    def sort_key(key):
+        return day_ordinal(key[0]), key[1]
+
+    def next_chunk(self):
+        chunk, self.keys = self.keys[: self.chunk_size], self.keys[self.chunk_size :]
+        if not chunk:
+            self.task = None
+            self.state = None
+            if os.path.exists(self.state_path):
+                os.remove(self.state_path)
+            self.finished.emit()
+            return
+
+        items = [(day, time, self.tracker.get_entry(day, time)) for day, time in chunk]
+        self.task = RecomputeTask(items, dict(self.state))
+        self.task.signals.finished.connect(self.on_finished)
+        self.task.signals.failed.connect(self.on_failed)
+        self.pool.start(self.task)
+
+    def on_finished(self, task, updates):
+        # a newer settings change restarted the job
+        if task is not self.task:
+            return
+
+        # entries submitted or pulled while the chunk was on the pool are
+        # newer than the copies it recomputed
+        snapshot = {(day, time): entry for day, time, entry in task.items}
+        updates = [
+            (day, time, entry)
+            for day, time, entry in updates
+            if self.current(day, time) == snapshot[day, time]
+        ]
+        if updates:
+            self.tracker.add_entries(updates)
+        self.state["cursor"] = list(task.items[-1][:2])
+        self.save_state()
+
+        if updates:
+            self.updated.emit()
+        self.next_chunk()
+
+    def current(self, day, time):
+        try:
+            return self.tracker.get_entry(day, time)
+        except KeyError:
+            return None
+
+    def on_failed(self, task, message):
+        if task is self.task:
+            print("Recompute stopped:", message)
+            self.task = None
+
+    def load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as file:
+                return json.loads(file.read())
+        return None
+
+    def save_state(self):
+        write_atomic(self.state_path, json.dumps(self.state, indent=4))
+
+
+class SyncTask(Task):
+    """
+    Pushes local changes and pulls remote ones on a pool thread.
+    """
+
+    def __init__(self, remote, items, since):
+        super().__init__()
+        self.remote = remote
+        self.items = items
+        self.since = since
+
+    def work(self):
+        if self.items:
+            self.remote.push(self.items)
+        return self.remote.pull(self.since)
+
+
+class EntrySync(QObject):
+    """
+    Keeps entries in step with DynamoDB (see sync.py) by exchanging deltas.
+
+    Every entry the tracker saves is marked dirty with the time of the
+    change, and dirty keys are kept in sync.json so changes made offline
+    are pushed later. A sync pushes the dirty entries and pulls what other
+    devices wrote since the last sequence number it saw, on the thread
+    pool; pulled entries are saved on the GUI thread. Where both sides
+    changed an entry, the later change wins.
+    """
+
+    pulled = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    # pulls start this many sequence numbers back: a batch can take its
+    # numbers before another device's batch and land after it
+    overlap = 4 * BATCH_SIZE
+
+    def __init__(
+        self,
+        tracker,
+        remote=None,
+        state_path="sync.json",
+        interval=60,
+        delay=5,
+        pool=None,
+    ):
+        super().__init__()
+        self.tracker = tracker
+        self.state_path = state_path
+        self.pool = pool if pool else QThreadPool.globalInstance()
+        self.task = None
+        self.again = False
+        self.applying = False
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval * 1000)
+        self.timer.timeout.connect(self.sync)
+        # local changes go out shortly after they stop coming
+        self.push_timer = QTimer(self)
+        self.push_timer.setSingleShot(True)
+        self.push_timer.setInterval(delay * 1000)
+        self.push_timer.timeout.connect(self.sync)
+
+        self.state = self.load_state()
+        if self.state is None:
+            # nothing synced yet: everything stored so far goes up first
+            self.state = {"device": uuid.uuid4().hex, "last_seq": 0, "dirty": {}}
+            self.mark(
+                [
+                    (day, time)
+                    for day in tracker.sorted_days()
+                    for time in tracker.sorted_times(day)
+                ]
+            )
+
+        self.remote = (
+            remote
+            if remote
+            else DynamoRemote(
+                constants.dynamodb_table,
+                constants.dynamodb_user or self.state["device"],
+                self.state["device"],
+                constants.dynamodb_endpoint,
+                constants.dynamodb_region,
+            )
+        )
+        tracker.watchers.append(self.mark)
+
+    def start(self):
+        self.timer.start()
+        self.sync()
+
+    def stop(self):
+        self.timer.stop()
+        self.push_timer.stop()
+
+    @staticmethod
+    def key(day, time):
+        return f"{day} {time}"
+
+    def mark(self, keys):
+        # entries pulled from the table aren't local changes
+        if self.applying or not keys:
+            return
+
+        now = int(time.time() * 1000)
+        for day, start_time in keys:
+            self.state["dirty"][self.key(day, start_time)] = now
+        self.save_state()
+        self.push_timer.start()
+
+    def sync(self):
+        self.push_timer.stop()
+        if self.task:
+            self.again = True
+            return
+
+        items = []
+        for key, updated in self.state["dirty"].items():
+            day, start_time = key.split(" ")
+            items.append(
+                (day, start_time, self.tracker.get_entry(day, start_time), updated)
+            )
+        since = max(self.state["last_seq"] - self.overlap, 0)
+
+        self.task = SyncTask(self.remote, items, since)
+        self.task.signals.finished.connect(self.on_finished)
+        self.task.signals.failed.connect(self.on_failed)
+        self.pool.start(self.task)
+
+    def on_finished(self, task, result):
+        self.task = None
+        remote_items, last_seq = result
+        dirty = self.state["dirty"]
+
+        # keys changed again while the push was running stay dirty
+        for day, start_time, _, updated in task.items:
+            key = self.key(day, start_time)
+            if dirty.get(key) == updated:
+                del dirty[key]
+
+        changes = []
+        for day, start_time, entry, updated, device, _ in remote_items:
+            key = self.key(day, start_time)
+            if device == self.state["device"] or dirty.get(key, 0) > updated:
+                continue
+            dirty.pop(key, None)
+            try:
+                current = self.tracker.get_entry(day, start_time)
+            except KeyError:
+                current = None
+            if current != entry:
+                changes.append((day, start_time, entry))
+
+        if changes:
+            self.applying = True
+            try:
+                self.tracker.add_entries(changes)
+            finally:
+                self.applying = False
+
+        self.state["last_seq"] = max(self.state["last_seq"], last_seq)
+        self.save_state()
+        if changes:
+            self.pulled.emit()
+
+        if self.again:
+            self.again = False
+            self.sync()
+
+    def on_failed(self, task, message):
+        # dirty keys are kept for the next attempt
+        self.task = None
+        self.again = False
+        print("Sync failed:", message)
+        self.failed.emit(message)
+
+    def load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as file:
+                return json.loads(file.read())
+        return None
+
+    def save_state(self):
+        write_atomic(self.state_path, json.dumps(self.state, indent=4))